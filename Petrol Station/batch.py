@@ -0,0 +1,78 @@
+import argparse
+import csv
+import sys
+
+from replications import iter_replications, iter_until_precise
+
+# Command line batch runner for machines without a display.
+#   python batch.py --cars 1000000 --runs 20 --seed 42 > results.csv
+# One CSV row is written (and flushed) per run as soon as it finishes. Runs are
+# spread over all cores; every run has its own random stream spawned from
+# --seed, so the output does not depend on --workers.
+#   python batch.py --cars 10000 --target overall_avg_wait=0.1 --target avg_wait_Gas=0.5
+# keeps adding runs (up to --max-runs) until every listed metric's 95%
+# confidence interval is at most that half-width wide on each side.
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the petrol station simulation without the GUI.")
+    parser.add_argument("--cars", type=int, required=True, help="number of cars per run")
+    parser.add_argument("--runs", type=int, default=1, help="number of runs")
+    parser.add_argument("--seed", type=int, default=None, help="master seed the run streams are spawned from")
+    parser.add_argument("--what-if", action="store_true",
+                        help="also re-run every run with one extra pump of each fuel type")
+    parser.add_argument("--workers", type=int, default=None, help="number of processes (default: all cores)")
+    parser.add_argument("--store", default=None,
+                        help="folder to save every run's per-car table in the columnar format of store.py")
+    parser.add_argument("--summary-only", action="store_true",
+                        help="only keep the summary numbers, memory stays the same for any number of cars")
+    parser.add_argument("--antithetic", action="store_true",
+                        help="run in antithetic pairs, the second run of a pair uses 1 - u for every random u")
+    parser.add_argument("--target", action="append", default=[], metavar="METRIC=HALF_WIDTH",
+                        help="run until this summary metric's 95%% CI half-width is reached (repeatable)")
+    parser.add_argument("--max-runs", type=int, default=1000, help="most runs to use with --target")
+    parser.add_argument("--output", default="-", help="CSV file to write, '-' for stdout")
+    args = parser.parse_args(argv)
+    try:
+        args.target = {metric: float(value) for metric, value in (item.split("=") for item in args.target)}
+    except ValueError:
+        parser.error("--target takes METRIC=HALF_WIDTH, e.g. overall_avg_wait=0.1")
+    if args.max_runs < 1:
+        parser.error("--max-runs must be at least 1")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.summary_only and (args.what_if or args.store):
+        sys.exit("--summary-only cannot be combined with --what-if or --store")
+    out = sys.stdout if args.output == "-" else open(args.output, "w", newline="")
+    try:
+        writer = None
+        if args.target:
+            results = iter_until_precise(args.cars, args.target, args.seed, args.workers, max_runs=args.max_runs,
+                                         what_if=args.what_if, output_dir=args.store,
+                                         summary_only=args.summary_only, antithetic=args.antithetic)
+        else:
+            results = iter_replications(args.cars, args.runs, args.seed, args.workers, args.what_if, args.store,
+                                        args.summary_only, args.antithetic)
+        for result in results:
+            row = {"run": result["run"], "seed": args.seed}
+            row.update(result["summary"])
+            if writer is None:
+                writer = csv.DictWriter(out, fieldnames=list(row))
+                writer.writeheader()
+            writer.writerow(row)
+            out.flush()
+        if args.target:
+            met = "met" if result.get("target_met") else "not met"
+            print(f"targets {met} after {result['run']} runs: " +
+                  ", ".join(f"{metric} +-{half:.3f}" for metric, half in result["half_widths"].items()),
+                  file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,535 @@
+import os
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+import simcore_path  # puts the repo root on sys.path
+from simcore import instrument
+
+# Headless petrol station model. Nothing in here touches Tkinter so it can be
+# imported by the GUI, the batch runner or any scheduled job.
+
+PUMPS = ["95", "90", "Gas"]
+CATEGORIES = ["A", "B", "C"]
+
+# Probability tables, (value, cumulative probability) like the inventory model
+category_table = [("A", 0.20), ("B", 0.55), ("C", 1.00)]
+
+service_time_tables = {
+    "A": [(1, 0.20), (2, 0.50), (3, 1.00)],
+    "B": [(1, 0.20), (2, 0.50), (3, 1.00)],
+    "C": [(3, 0.20), (5, 0.70), (7, 1.00)],
+}
+
+inter_arrival_table = [(0, 0.17), (1, 0.40), (2, 0.65), (3, 1.00)]
+
+# Routing rule: a B car that finds more than threshold_90 cars at the 90 pump
+# goes to 95 with probability divert_90, a C car that finds more than
+# threshold_gas at Gas goes to 90 with probability divert_gas.
+DEFAULT_ROUTING = {"threshold_90": 3, "divert_90": 0.6, "threshold_gas": 4, "divert_gas": 0.4}
+
+
+# Scenario parameters: a scenario is a dict that overrides any of the routing
+# values, the three tables above (same categories) or servers ({fuel type:
+# pumps}); whatever it leaves out is the station as modelled here. Returns
+# the full set, e.g. scenario_parameters({"divert_90": 0.8})["threshold_90"].
+def scenario_parameters(scenario=None):
+    params = dict(DEFAULT_ROUTING, category_table=category_table, service_time_tables=service_time_tables,
+                  inter_arrival_table=inter_arrival_table, servers={})
+    unknown = set(scenario or {}) - set(params)
+    if unknown:
+        raise ValueError(f"unknown scenario parameters: {', '.join(sorted(unknown))}")
+    params.update(scenario or {})
+    return params
+
+
+def theoretical_average(table):
+    total = 0
+    previous = 0
+    for value, prob in table:
+        total += value * (prob - previous)
+        previous = prob
+    return total
+
+
+def theoretical_means(scenario=None):
+    params = scenario_parameters(scenario)
+    th_avg_service = {}
+    for category in CATEGORIES:
+        th_avg_service[category] = round(theoretical_average(params["service_time_tables"][category]), 2)
+    th_avg_inter_time = round(theoretical_average(params["inter_arrival_table"]), 2)
+    return th_avg_service, th_avg_inter_time
+
+
+# Batched sampling: whole arrays are drawn from a numpy Generator and mapped
+# through the cumulative tables (inverse CDF). rand <= p picks the value, so
+# the index of a draw is the number of cumulative probabilities it is
+# strictly bigger than.
+#
+# Sampling 1M cars (categories + service + inter-arrival + diversion draws):
+#   one random.random() call per draw   ~0.75 s
+#   sample_cars                         ~0.07 s   (about 10x faster, same ratio at 10M cars)
+def _inverse_cdf(table, rand):
+    values = np.array([value for value, _ in table])
+    index = np.zeros(len(rand), dtype=np.int8)
+    for _, prob in table[:-1]:
+        index += rand > prob
+    return values[index]
+
+
+# draws everything needed for n cars. Categories come back as codes into
+# CATEGORIES (0 = A, 1 = B, 2 = C).
+# antithetic=True maps every uniform draw u to 1 - u: the same seed then gives
+# the mirror image of a run (long gaps where it had short ones and so on),
+# which is negatively correlated with it. scenario can replace the tables
+# (see scenario_parameters()).
+def sample_cars(rng, n_cars, antithetic=False, scenario=None):
+    params = scenario_parameters(scenario)
+    service_time_tables = params["service_time_tables"]
+    draw = (lambda size: 1 - rng.random(size)) if antithetic else rng.random
+    code_table = [(code, prob) for code, (_, prob) in enumerate(params["category_table"])]
+    category_codes = _inverse_cdf(code_table, draw(n_cars)).astype(np.int8)
+
+    # one row per category, padded so every row has the same length
+    width = max(len(service_time_tables[c]) for c in CATEGORIES)
+    values = np.zeros((len(CATEGORIES), width), dtype=np.int64)
+    cumulative = np.ones((len(CATEGORIES), width))
+    for code, category in enumerate(CATEGORIES):
+        table = service_time_tables[category]
+        values[code, :] = table[-1][0]
+        values[code, :len(table)] = [value for value, _ in table]
+        cumulative[code, :len(table)] = [prob for _, prob in table]
+    service_rand = draw(n_cars)
+    index = np.zeros(n_cars, dtype=np.int8)
+    for column in range(width - 1):
+        index += service_rand > cumulative[category_codes, column]
+    service_times = values[category_codes, index]
+
+    inter_arrival_times = _inverse_cdf(params["inter_arrival_table"], draw(n_cars)).astype(np.int64)
+    divert_rand = draw(n_cars)  # used only when a car finds a long queue
+    return category_codes, inter_arrival_times, service_times, divert_rand
+
+
+# same as sample_cars but in chunks so memory does not grow with n_cars.
+# Arrival times carry on from one chunk to the next.
+def sample_car_chunks(rng, n_cars, chunk_size=1_000_000, antithetic=False, scenario=None):
+    clock = 0
+    done = 0
+    while done < n_cars:
+        size = min(chunk_size, n_cars - done)
+        category_codes, inter_arrival_times, service_times, divert_rand = sample_cars(rng, size, antithetic, scenario)
+        arrival_times = clock + np.cumsum(inter_arrival_times)
+        clock = int(arrival_times[-1])
+        done += size
+        yield category_codes, inter_arrival_times, arrival_times, service_times, divert_rand
+
+
+# FIFO queue of one fuel type served by `servers` identical pumps. Two heaps
+# are kept: the end times of the cars still at the pumps (for the queue length
+# at an arrival) and the time each pump becomes free (for the start of service).
+# Finished cars are popped as time moves on, so a car costs O(log n) instead
+# of rebuilding the whole queue on every arrival.
+class PumpQueue:
+    def __init__(self, servers=1):
+        if servers < 1:
+            raise ValueError("a fuel type needs at least one pump")
+        self.servers = servers
+        self.end_times = []
+        self.free_times = [0] * servers
+        self.max_length = 0
+        self.busy_time = 0
+        self.last_end_time = 0
+
+    # number of cars at the pumps (waiting or being served) at the given time
+    def length_at(self, time):
+        end_times = self.end_times
+        while end_times and end_times[0] <= time:
+            heapq.heappop(end_times)
+        return len(end_times)
+
+    # puts a car in the queue and returns its (start, end) of service
+    def serve(self, arrival, service):
+        length = self.length_at(arrival) + 1
+        if length > self.max_length:
+            self.max_length = length
+        start_time = max(arrival, self.free_times[0])
+        end_time = start_time + service
+        heapq.heapreplace(self.free_times, end_time)
+        heapq.heappush(self.end_times, end_time)
+        self.busy_time += service
+        if end_time > self.last_end_time:
+            self.last_end_time = end_time
+        return start_time, end_time
+
+    # time the pumps stood empty between 0 and end_time, summed over pumps
+    def idle_time(self, end_time):
+        return self.servers * end_time - self.busy_time
+
+
+# how often (in cars) the routing loop calls its progress callback
+PROGRESS_EVERY = 50_000
+
+
+# routes already sampled cars through the pumps. servers maps a fuel type to
+# its number of pumps (one each by default). Returns the start of service and
+# the pump of every car (a code into PUMPS) plus the queues for the pump
+# statistics. progress, if
+# given, is called as progress(cars_done, n_cars) every PROGRESS_EVERY cars.
+# queues from an earlier call carry the station on from where it stopped.
+# routing has the thresholds and probabilities of DEFAULT_ROUTING.
+def route_cars(category_codes, arrivals, service_times, divert_rand, servers=None, progress=None, queues=None,
+               routing=None):
+    if queues is None:
+        servers = servers or {}
+        queues = {pump: PumpQueue(servers.get(pump, 1)) for pump in PUMPS}
+    queue_95, queue_90, queue_gas = queues["95"], queues["90"], queues["Gas"]
+    routing = routing or DEFAULT_ROUTING
+    threshold_90, divert_90 = routing["threshold_90"], routing["divert_90"]
+    threshold_gas, divert_gas = routing["threshold_gas"], routing["divert_gas"]
+    service_begins = []
+    pumps = []
+
+    n_cars = len(category_codes)
+    for i in range(n_cars): # loop through all cars to simulate them
+        if progress is not None and i % PROGRESS_EVERY == 0:
+            progress(i, n_cars)
+        category = category_codes[i]
+        arrival = arrivals[i]
+
+        # cars that find a long queue may go to another pump (pump codes:
+        # 0 = 95, 1 = 90, 2 = Gas)
+        if category == 0:
+            queue = queue_95
+            selected_pump = 0
+        elif category == 1:
+            if queue_90.length_at(arrival) > threshold_90 and divert_rand[i] <= divert_90:
+                queue = queue_95
+                selected_pump = 0
+            else:
+                queue = queue_90
+                selected_pump = 1
+        else:
+            if queue_gas.length_at(arrival) > threshold_gas and divert_rand[i] <= divert_gas:
+                queue = queue_90
+                selected_pump = 1
+            else:
+                queue = queue_gas
+                selected_pump = 2
+
+        start_time, _ = queue.serve(arrival, service_times[i])
+        service_begins.append(start_time)
+        pumps.append(selected_pump)
+
+    return service_begins, pumps, queues
+
+
+# simulates n_cars through the station and returns (data, stats) like runSim
+# does in the inventory model. seed makes a run reproducible. With what_if the
+# same cars are also run with one extra pump of each fuel type (policy
+# question 8), using up to `workers` processes; it is off by default, it starts
+# a process pool and the GUI is what asks for it. scenario changes the
+# routing, tables or pumps (see scenario_parameters()).
+def run_simulation(n_cars, seed=None, what_if=False, workers=None, progress=None, antithetic=False, scenario=None):
+    if n_cars < 1:
+        raise ValueError("n_cars must be at least 1")
+    rng = np.random.default_rng(seed)
+    params = scenario_parameters(scenario)
+
+    with instrument.phase("sampling"):
+        category_codes, inter_arrival_times, service_times, divert_rand = sample_cars(rng, n_cars, antithetic,
+                                                                                      params)
+        arrival_times = np.cumsum(inter_arrival_times)
+        # plain ints are faster than numpy scalars in the routing loop
+        cars = (category_codes.tolist(), arrival_times.tolist(), service_times.tolist(), divert_rand.tolist())
+
+    with instrument.phase("routing"):
+        service_begins, pumps, queues = route_cars(*cars, servers=params["servers"], progress=progress,
+                                                   routing=params)
+    data, stats = build_results(category_codes, arrival_times, service_times, inter_arrival_times,
+                                service_begins, pumps, queues, params)
+    if what_if:
+        with instrument.phase("what_if"):
+            stats["extra_pump"] = extra_pump_effects(cars, workers=workers, scenario=params)
+    if instrument.enabled:
+        _count_routing(category_codes, data["Pump"].cat.codes.to_numpy())
+    return data, stats
+
+
+# the per-car table and its statistics from the routing results. queues has
+# the PumpQueue of every pump. Category and Pump are categoricals and
+# whole-minute columns int32, about 26 bytes per car instead of 64 plus a
+# string object per cell.
+def build_results(category_codes, arrival_times, service_times, inter_arrival_times, service_begins, pump_codes,
+                  queues, scenario=None):
+    n_cars = len(category_codes)
+    service_begins = np.asarray(service_begins)
+    service_ends = service_begins + service_times
+    simulation_end_time = service_ends.max().item()  # int, or float for continuous times
+
+    pump_idle_times = {}
+    max_queue_length = {}
+    for pump, queue in queues.items():
+        pump_idle_times[pump] = queue.idle_time(simulation_end_time)
+        max_queue_length[pump] = queue.max_length
+
+    with instrument.phase("dataframe"):
+        data = pd.DataFrame({
+            "Car": np.arange(1, n_cars + 1, dtype=np.int32),
+            "Category": pd.Categorical.from_codes(np.asarray(category_codes, dtype=np.int8), CATEGORIES),
+            "Arrival Time": compact_ints(arrival_times),
+            "Service Time": compact_ints(service_times),
+            "Service Begins": compact_ints(service_begins),
+            "Service Ends": compact_ints(service_ends),
+            "Waiting Time": compact_ints(service_begins - arrival_times),
+            "Pump": pd.Categorical.from_codes(np.asarray(pump_codes, dtype=np.int8), PUMPS)
+        })
+
+    with instrument.phase("statistics"):
+        stats = calculate_statistics(data, pump_idle_times, max_queue_length, inter_arrival_times, scenario)
+    return data, stats
+
+
+# int32 copy of an integer array when every value fits, anything else as it is
+def compact_ints(values):
+    values = np.asarray(values)
+    if values.dtype.kind in "iu" and len(values) and \
+            np.iinfo(np.int32).min <= values.min() and values.max() <= np.iinfo(np.int32).max:
+        return values.astype(np.int32)
+    return values
+
+
+# codes into `labels` of a Category or Pump column, categorical or not
+def group_codes(column, labels):
+    if isinstance(column.dtype, pd.CategoricalDtype) and list(column.cat.categories) == list(labels):
+        return column.cat.codes.to_numpy()
+    return pd.Categorical(column, categories=labels).codes
+
+
+# cars per pump and cars that went to another pump because of a long queue,
+# worked out after the run so the routing loop has nothing extra to do
+def _count_routing(category_codes, pump_codes):
+    instrument.count("cars", len(pump_codes))
+    for code, count in enumerate(np.bincount(pump_codes, minlength=len(PUMPS))):
+        instrument.count(f"cars_to_{PUMPS[code]}", count)
+    instrument.count("balked_90_to_95", ((category_codes == 1) & (pump_codes == 0)).sum())
+    instrument.count("balked_gas_to_90", ((category_codes == 2) & (pump_codes == 1)).sum())
+
+
+# headline numbers of one pump configuration. The average queue length is the
+# time average number of cars waiting (total waiting time / length of the run).
+def _configuration_summary(cars, servers, routing=None):
+    service_begins, pumps, queues = route_cars(*cars, servers=servers, routing=routing)
+    arrivals = np.array(cars[1])
+    waits = np.array(service_begins) - arrivals
+    pump_codes = np.array(pumps)
+    end_time = max(queue.last_end_time for queue in queues.values())
+    total_wait = np.bincount(pump_codes, weights=waits, minlength=len(PUMPS))
+    count = np.bincount(pump_codes, minlength=len(PUMPS))
+
+    summary = {"servers": {pump: queues[pump].servers for pump in PUMPS},
+               "overall_avg_wait": float(waits.mean()),
+               "overall_avg_queue": float(waits.sum() / end_time) if end_time else 0.0}
+    for code, pump in enumerate(PUMPS):
+        summary[f"avg_wait_{pump}"] = float(total_wait[code] / count[code]) if count[code] else 0.0
+        summary[f"avg_queue_{pump}"] = float(total_wait[code] / end_time) if end_time else 0.0
+        summary[f"max_queue_{pump}"] = queues[pump].max_length
+        summary[f"idle_{pump}"] = queues[pump].idle_time(end_time)
+    return summary
+
+
+def _run_configuration(args):
+    cars, servers, routing = args
+    return _configuration_summary(cars, servers, routing)
+
+
+# re-simulates the same cars with different numbers of pumps per fuel type.
+# configurations is a list of {fuel type: pumps}; every configuration runs in
+# its own process when more than one worker is available. Returns one summary
+# per configuration, in the same order.
+def compare_configurations(cars, configurations, workers=None, routing=None):
+    if workers is None:
+        workers = min(len(configurations), os.cpu_count() or 1)
+    jobs = [(cars, servers, routing) for servers in configurations]
+    if workers <= 1:
+        return [_run_configuration(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_run_configuration, jobs))
+
+
+# policy question 8: what changes when one more pump of each fuel type is added.
+# Each entry holds the new averages and the change against the current station.
+def extra_pump_effects(cars, extra=1, workers=None, scenario=None):
+    params = scenario_parameters(scenario)
+    servers = params["servers"]
+    routing = {name: params[name] for name in DEFAULT_ROUTING}
+    configurations = [servers] + [dict(servers, **{pump: servers.get(pump, 1) + extra}) for pump in PUMPS]
+    baseline, *results = compare_configurations(cars, configurations, workers, routing)
+    effects = {}
+    for pump, result in zip(PUMPS, results):
+        effects[pump] = {
+            "avg_wait": round(result["overall_avg_wait"], 2),
+            "wait_change": round(result["overall_avg_wait"] - baseline["overall_avg_wait"], 2),
+            "avg_queue_change": round(result["overall_avg_queue"] - baseline["overall_avg_queue"], 2),
+            "idle_change": result[f"idle_{pump}"] - baseline[f"idle_{pump}"],
+        }
+    return effects
+
+
+# per-category and per-pump sums of one batch of cars, from bincounts over
+# the codes (one pass over the cars each instead of one boolean mask per
+# group). Totals of several batches can simply be added up.
+def group_totals(categories, service_times, pumps, waiting_times):
+    return {
+        "cars_per_category": np.bincount(categories, minlength=len(CATEGORIES)),
+        "service_per_category": np.bincount(categories, weights=service_times, minlength=len(CATEGORIES)),
+        "cars_per_pump": np.bincount(pumps, minlength=len(PUMPS)),
+        "waiting_per_pump": np.bincount(pumps, weights=waiting_times, minlength=len(PUMPS)),
+        "waited_per_pump": np.bincount(pumps, weights=waiting_times > 0, minlength=len(PUMPS)),
+    }
+
+
+def calculate_statistics(data, pump_idle_times, max_queue_length, inter_arrival_times, scenario=None):
+    totals = group_totals(group_codes(data["Category"], CATEGORIES), data["Service Time"].to_numpy(),
+                          group_codes(data["Pump"], PUMPS), data["Waiting Time"].to_numpy())
+    return statistics_from_totals(totals, len(data), pump_idle_times, max_queue_length,
+                                  float(np.mean(inter_arrival_times)), scenario)
+
+
+def statistics_from_totals(totals, n_cars, pump_idle_times, max_queue_length, mean_inter_arrival_time,
+                           scenario=None):
+    avg_service_time = {}
+    for code, category in enumerate(CATEGORIES):
+        count = totals["cars_per_category"][code]
+        avg_service_time[category] = round(totals["service_per_category"][code] / count, 2) if count else float("nan")
+
+    avg_waiting_time_per_pump = {}
+    waiting_probabilities = {}
+    for code, pump in enumerate(PUMPS):
+        count = totals["cars_per_pump"][code]
+        avg_waiting_time_per_pump[pump] = round(totals["waiting_per_pump"][code] / count, 2) if count else float("nan")
+        waiting_probabilities[pump] = round(totals["waited_per_pump"][code] / count if count > 0 else 0, 2)
+
+    overall_avg_waiting_time = round(totals["waiting_per_pump"].sum() / n_cars, 2)
+
+    th_avg_service, th_avg_inter_time = theoretical_means(scenario)
+    exp_avg_inter_time = round(mean_inter_arrival_time, 2)
+
+    return {
+        "n_cars": n_cars,
+        "avg_service_time": avg_service_time,
+        "avg_waiting_time_per_pump": avg_waiting_time_per_pump,
+        "overall_avg_waiting_time": overall_avg_waiting_time,
+        "max_queue_lengths": dict(max_queue_length),
+        "waiting_probabilities": waiting_probabilities,
+        "idle_times": dict(pump_idle_times),
+        "th_avg_service": th_avg_service,
+        "th_avg_inter_time": th_avg_inter_time,
+        "exp_avg_inter_time": exp_avg_inter_time,
+    }
+
+
+# Summary-only run for capacity studies: cars are sampled, routed and folded
+# into the per-group totals one chunk at a time and the per-car table is
+# never built, so memory depends on chunk_size (about 35 MB traced at the
+# default) and not on n_cars. Returns the
+# stats of run_simulation(what_if=False) and, with trace_every=k, a table of
+# every k-th car for debugging (None otherwise). When n_cars <= chunk_size the
+# stats are exactly those of run_simulation with the same seed; longer runs
+# draw their cars chunk by chunk, so they follow a different random path.
+def run_summary(n_cars, seed=None, chunk_size=100_000, trace_every=None, progress=None, antithetic=False,
+                scenario=None):
+    if n_cars < 1:
+        raise ValueError("n_cars must be at least 1")
+    rng = np.random.default_rng(seed)
+    params = scenario_parameters(scenario)
+    queues = {pump: PumpQueue(params["servers"].get(pump, 1)) for pump in PUMPS}
+    totals = None
+    inter_arrival_total = 0
+    trace = []
+    done = 0
+    for category_codes, inter_arrival_times, arrival_times, service_times, divert_rand in \
+            sample_car_chunks(rng, n_cars, chunk_size, antithetic, params):
+        report = None if progress is None else (lambda i, _, done=done: progress(done + i, n_cars))
+        service_begins, pumps, _ = route_cars(category_codes.tolist(), arrival_times.tolist(),
+                                              service_times.tolist(), divert_rand.tolist(),
+                                              progress=report, queues=queues, routing=params)
+        service_begins = np.array(service_begins)
+        pump_codes = np.array(pumps, dtype=np.int8)
+        waiting_times = service_begins - arrival_times
+        chunk_totals = group_totals(category_codes, service_times, pump_codes, waiting_times)
+        totals = chunk_totals if totals is None else {name: totals[name] + chunk_totals[name] for name in totals}
+        inter_arrival_total += int(inter_arrival_times.sum())
+        if trace_every:
+            keep = np.arange(-done % trace_every, len(category_codes), trace_every)
+            trace.append(pd.DataFrame({
+                "Car": (done + keep + 1).astype(np.int32),
+                "Category": pd.Categorical.from_codes(category_codes[keep], CATEGORIES),
+                "Arrival Time": compact_ints(arrival_times[keep]),
+                "Service Time": compact_ints(service_times[keep]),
+                "Service Begins": compact_ints(service_begins[keep]),
+                "Service Ends": compact_ints(service_begins[keep] + service_times[keep]),
+                "Waiting Time": compact_ints(waiting_times[keep]),
+                "Pump": pd.Categorical.from_codes(pump_codes[keep], PUMPS),
+            }))
+        done += len(category_codes)
+
+    end_time = max(queue.last_end_time for queue in queues.values())
+    pump_idle_times = {pump: queue.idle_time(end_time) for pump, queue in queues.items()}
+    max_queue_length = {pump: queue.max_length for pump, queue in queues.items()}
+    stats = statistics_from_totals(totals, n_cars, pump_idle_times, max_queue_length, inter_arrival_total / n_cars,
+                                   params)
+    return stats, (pd.concat(trace, ignore_index=True) if trace_every else None)
+
+
+# text block shown under the table in the GUI
+def format_statistics(stats):
+    lines = ["Statistics:", "1. Average Service Time per Category:"]
+    for category, avg_time in stats["avg_service_time"].items():
+        lines.append(f"   {category}: {avg_time}")
+    lines.append("")
+    lines.append("2. Average Waiting Time per Pump:")
+    for pump, avg_time in stats["avg_waiting_time_per_pump"].items():
+        lines.append(f"   {pump}: {avg_time}")
+    lines.append(f"   Overall Average Waiting Time: {stats['overall_avg_waiting_time']}")
+    lines.append("")
+    lines.append("3. Maximum Queue Lengths:")
+    for pump, length in stats["max_queue_lengths"].items():
+        lines.append(f"   {pump}: {length}")
+    lines.append("")
+    lines.append("4. Waiting Probabilities per Pump:")
+    for pump, prob in stats["waiting_probabilities"].items():
+        lines.append(f"   {pump}: {prob}")
+    lines.append("")
+    lines.append("5. Idle Time :")
+    for pump, idle in stats["idle_times"].items():
+        lines.append(f"   {pump}: {idle}")
+    lines.append("")
+    lines.append("Policy Questions:")
+    lines.append("6. Theoretical vs Experimental Average Service Time per Category:")
+    for category, avg_time in stats["avg_service_time"].items():
+        lines.append(f"   Category {category}: Theoretical = {stats['th_avg_service'][category]}, Experimental = {avg_time}")
+    lines.append("7. Theoretical vs Experimental Average Inter-Arrival Time:")
+    lines.append(f"   Theoretical = {stats['th_avg_inter_time']}, Experimental = {stats['exp_avg_inter_time']}")
+    if "extra_pump" in stats:
+        lines.append("8. Effect of Adding Extra Pump:")
+        for pump, effect in stats["extra_pump"].items():
+            lines.append(f"   Adding an extra {pump} pump changes average waiting time to {effect['avg_wait']} "
+                         f"({effect['wait_change']:+}), average queue length by {effect['avg_queue_change']:+} "
+                         f"and {pump} idle time by {effect['idle_change']:+}")
+    return "\n".join(lines) + "\n"
+
+
+# flat row of the headline numbers, used by the batch runner
+def summary_row(stats):
+    row = {"n_cars": stats["n_cars"], "overall_avg_wait": stats["overall_avg_waiting_time"]}
+    for category in CATEGORIES:
+        row[f"avg_service_{category}"] = stats["avg_service_time"][category]
+    for pump in PUMPS:
+        row[f"avg_wait_{pump}"] = stats["avg_waiting_time_per_pump"][pump]
+        row[f"max_queue_{pump}"] = stats["max_queue_lengths"][pump]
+        row[f"p_wait_{pump}"] = stats["waiting_probabilities"][pump]
+        row[f"idle_{pump}"] = stats["idle_times"][pump]
+    for pump, effect in stats.get("extra_pump", {}).items():
+        row[f"extra_{pump}_avg_wait"] = effect["avg_wait"]
+    return row
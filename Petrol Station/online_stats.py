@@ -0,0 +1,148 @@
+import math
+import numpy as np
+
+import simcore_path  # puts the repo root on sys.path
+from simcore.stats import t_half_width
+from engine import CATEGORIES, PUMPS, group_codes
+
+# Online statistics for many replications. Instead of keeping every run's
+# DataFrame and concatenating them, each run is folded into running counts,
+# means and sums of squared deviations (Welford / Chan et al.) plus integer
+# histograms. Accumulators can be merged, so workers build one per run and the
+# parent folds them in as they arrive. Memory does not depend on the number of
+# runs or cars.
+
+
+class RunningStats:
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of squared deviations from the mean
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    # folds a whole array in at once
+    def add_values(self, values):
+        values = np.asarray(values, dtype=float)
+        if len(values) == 0:
+            return
+        other = RunningStats()
+        other.count = len(values)
+        other.mean = float(values.mean())
+        other.m2 = float(((values - other.mean) ** 2).sum())
+        other.min = float(values.min())
+        other.max = float(values.max())
+        self.merge(other)
+
+    def merge(self, other):
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else float("nan")
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance) if self.count > 1 else float("nan")
+
+    # half width of the t confidence interval of the mean
+    def half_width(self, level=0.95):
+        return t_half_width(self.std, self.count, level)
+
+    def confidence_interval(self, level=0.95):
+        half = self.half_width(level)
+        return self.mean - half, self.mean + half
+
+
+# counts of non-negative integer values (service and waiting times are whole
+# minutes), grows as bigger values show up
+class Histogram:
+    def __init__(self):
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def add_values(self, values):
+        values = np.asarray(values, dtype=np.int64)
+        if len(values) == 0:
+            return
+        self._add_counts(np.bincount(values))
+
+    def merge(self, other):
+        self._add_counts(other.counts)
+
+    def _add_counts(self, counts):
+        if len(counts) > len(self.counts):
+            self.counts = np.pad(self.counts, (0, len(counts) - len(self.counts)))
+        self.counts[:len(counts)] += counts
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+
+# everything the multi-run screens need, per category and per pump, plus the
+# per-run summary numbers (their spread across runs gives honest confidence
+# intervals, cars inside one run are correlated)
+class SummaryAccumulator:
+    def __init__(self):
+        self.runs = 0
+        self.service_time = {category: RunningStats() for category in CATEGORIES}
+        self.service_histogram = {category: Histogram() for category in CATEGORIES}
+        self.waiting_time = {pump: RunningStats() for pump in PUMPS}
+        self.waiting_histogram = {pump: Histogram() for pump in PUMPS}
+        self.overall_waiting_time = RunningStats()
+        self.run_metrics = {}
+
+    # folds one run in, data is the per-car table (None for summary-only runs,
+    # which only add their summary_row) and summary its summary_row
+    def add_run(self, data, summary=None):
+        self.runs += 1
+        if data is not None:
+            self._add_cars(data)
+        for name, value in (summary or {}).items():
+            if isinstance(value, (int, float, np.integer, np.floating)) and not math.isnan(value):
+                self.run_metrics.setdefault(name, RunningStats()).add(float(value))
+
+    def _add_cars(self, data):
+        for column, value_column, keys, stats, histograms in (
+                ("Category", "Service Time", CATEGORIES, self.service_time, self.service_histogram),
+                ("Pump", "Waiting Time", PUMPS, self.waiting_time, self.waiting_histogram)):
+            groups = group_codes(data[column], keys)
+            values = data[value_column].to_numpy()
+            for code, key in enumerate(keys):
+                selected = values[groups == code]
+                stats[key].add_values(selected)
+                histograms[key].add_values(selected)
+        self.overall_waiting_time.add_values(data["Waiting Time"].to_numpy())
+
+    def merge(self, other):
+        self.runs += other.runs
+        for mine, theirs in ((self.service_time, other.service_time),
+                             (self.service_histogram, other.service_histogram),
+                             (self.waiting_time, other.waiting_time),
+                             (self.waiting_histogram, other.waiting_histogram),
+                             (self.run_metrics, other.run_metrics)):
+            for key, value in theirs.items():
+                if key not in mine:
+                    mine[key] = type(value)()
+                mine[key].merge(value)
+        self.overall_waiting_time.merge(other.overall_waiting_time)
+
+    # confidence interval of the mean of a per-run metric, e.g. "overall_avg_wait"
+    def confidence_interval(self, metric, level=0.95):
+        return self.run_metrics[metric].confidence_interval(level)
@@ -0,0 +1,186 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+import simcore_path  # puts the repo root on sys.path
+from simcore.stats import t_half_width
+from engine import run_simulation, run_summary, summary_row
+from online_stats import SummaryAccumulator
+from store import write_run, write_index
+from variance_reduction import run_measures
+
+# Independent replications of the petrol station spread over a process pool.
+# Every replication gets its own random stream spawned from one master seed
+# (SeedSequence.spawn), so replication i draws the same numbers whatever the
+# number of workers and the results are bit-identical between 1 and N cores.
+# Workers send back the run's summary row and a SummaryAccumulator instead of
+# the per-car DataFrame, which keeps the traffic between processes tiny.
+# With antithetic=True the runs come in pairs on one stream, the second run of
+# a pair drawing 1 - u for every u of the first (see variance_reduction.py).
+
+
+def spawn_seeds(seed, runs):
+    return np.random.SeedSequence(seed).spawn(runs)
+
+
+def _replicate(args):
+    run, n_cars, seed_sequence, what_if, output_dir, summary_only, antithetic = args
+    if summary_only:
+        # no per-car table, the accumulator only gets the run's summary row
+        data = None
+        stats, _ = run_summary(n_cars, seed_sequence, antithetic=antithetic)
+    else:
+        data, stats = run_simulation(n_cars, seed_sequence, what_if=what_if, workers=1, antithetic=antithetic)
+    if output_dir is not None:
+        write_run(output_dir, run, data)
+    summary = summary_row(stats)
+    accumulator = SummaryAccumulator()
+    accumulator.add_run(data, summary)
+    result = {"run": run, "rows": n_cars, "summary": summary, "accumulator": accumulator}
+    if data is not None:
+        result["measures"] = run_measures(data)  # for the control variate estimates
+    return result
+
+
+# (seed sequence, antithetic) per run; antithetic pairs share a sequence.
+# Spawning from the same root again continues where the last call stopped,
+# so runs added later get the streams a longer run count would have given.
+def _run_streams(root, runs, antithetic):
+    if not antithetic:
+        return [(seed_sequence, False) for seed_sequence in root.spawn(runs)]
+    pairs = root.spawn((runs + 1) // 2)
+    return [(pairs[index // 2], index % 2 == 1) for index in range(runs)]
+
+
+def _check_options(what_if, output_dir, summary_only):
+    if summary_only and (what_if or output_dir is not None):
+        raise ValueError("summary-only runs have no per-car table to store or re-run with extra pumps")
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+
+
+# yields one compact result per replication, in run order, as they finish.
+# output_dir, if given, gets every run's per-car table in the columnar store
+# (see store.py); workers write their own run and the index is written last.
+# summary_only runs use engine.run_summary(), which never builds the table
+# (no what-if and nothing to store).
+def iter_replications(n_cars, runs, seed=None, workers=None, what_if=False, output_dir=None, summary_only=False,
+                      antithetic=False):
+    _check_options(what_if, output_dir, summary_only)
+    streams = _run_streams(np.random.SeedSequence(seed), runs, antithetic)
+    written = []
+    try:
+        for result in _iter_results(n_cars, streams, 1, workers, what_if, output_dir, summary_only):
+            written.append((result["run"], result["rows"]))
+            yield result
+    finally:
+        # also on cancel, so the runs that did finish can be read back
+        if output_dir is not None:
+            write_index(output_dir, written)
+
+
+def _iter_results(n_cars, streams, first_run, workers, what_if, output_dir, summary_only):
+    jobs = [(run, n_cars, seed_sequence, what_if, output_dir, summary_only, flipped)
+            for run, (seed_sequence, flipped) in enumerate(streams, start=first_run)]
+    runs = len(jobs)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, runs)
+    if workers <= 1:
+        for job in jobs:
+            yield _replicate(job)
+        return
+    chunksize = max(1, runs // (workers * 4))
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        yield from executor.map(_replicate, jobs, chunksize=chunksize)
+    finally:
+        # if the caller stops early (cancel), drop the runs not started yet
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+# Sequential replications: runs are added in batches until the confidence
+# interval of every metric in `targets` (summary_row names, e.g.
+# {"overall_avg_wait": 0.1, "avg_wait_Gas": 0.5}) is at most that half-width,
+# or until max_runs. Each batch is sized from the current interval, a mean's
+# half-width shrinks with the square root of the runs, and at most doubles
+# the runs so far so that a noisy early estimate cannot overshoot by much.
+# Yields the same results as iter_replications() (run i is the same run
+# whatever the batches were), each with result["half_widths"] of the runs so
+# far; the last one also has result["target_met"], already set when it is
+# yielded. With antithetic=True the interval is taken over the pair means and
+# batches are whole pairs.
+def iter_until_precise(n_cars, targets, seed=None, workers=None, min_runs=10, max_runs=1000, level=0.95,
+                       what_if=False, output_dir=None, summary_only=False, antithetic=False):
+    if not targets:
+        raise ValueError("give at least one metric and its target half-width")
+    if min(targets.values()) <= 0:
+        raise ValueError("target half-widths must be positive")
+    if max_runs < 1:
+        raise ValueError("max_runs must be at least 1")
+    _check_options(what_if, output_dir, summary_only)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    step = 2 if antithetic else 1
+    min_runs = -(-max(min_runs, 2 * step + 1) // step) * step  # enough for a first interval, whole pairs
+    root = np.random.SeedSequence(seed)
+    values = {metric: [] for metric in targets}
+    written = []
+    batch = min(min_runs, max_runs)
+    try:
+        while batch > 0:
+            streams = _run_streams(root, batch, antithetic)
+            end = len(written) + batch
+            for result in _iter_results(n_cars, streams, len(written) + 1, workers, what_if, output_dir,
+                                        summary_only):
+                written.append((result["run"], result["rows"]))
+                for metric in targets:
+                    if metric not in result["summary"]:
+                        raise ValueError(f"unknown metric {metric!r}, use a column of engine.summary_row()")
+                    values[metric].append(result["summary"][metric])
+                result["half_widths"] = _half_widths(values, level, antithetic)
+                if len(written) == end:
+                    # the batch is complete: stop with this run or size the next batch
+                    batch = _next_batch(result, targets, max_runs, workers, step)
+                yield result
+    finally:
+        if output_dir is not None:
+            write_index(output_dir, written)
+
+
+# runs to add after the last run of a batch, 0 when it is the last run of
+# all; that one gets result["target_met"] before it is yielded
+def _next_batch(result, targets, max_runs, workers, step):
+    runs = result["run"]
+    half_widths = result["half_widths"]
+    needed = max(runs * (half_widths[metric] / target) ** 2 for metric, target in targets.items())
+    if needed <= runs or runs >= max_runs:
+        result["target_met"] = needed <= runs
+        return 0
+    batch = min(math.ceil(needed) - runs, runs, max_runs - runs)
+    batch = -(-max(batch, workers, step) // step) * step  # whole pairs, no idle workers
+    return min(batch, max_runs - runs)
+
+
+def _half_widths(values, level, antithetic):
+    half_widths = {}
+    for metric, runs in values.items():
+        observations = np.array(runs[:len(runs) // 2 * 2]).reshape(-1, 2).mean(axis=1) if antithetic \
+            else np.array(runs)
+        half_widths[metric] = float(t_half_width(observations.std(ddof=1), len(observations), level)) \
+            if len(observations) > 1 else math.inf
+    return half_widths
+
+
+def run_replications(n_cars, runs, seed=None, workers=None, what_if=False, output_dir=None):
+    return list(iter_replications(n_cars, runs, seed, workers, what_if, output_dir))
+
+
+# folds every replication into one SummaryAccumulator as it arrives. Runs are
+# merged in run order, so the result does not depend on the worker count.
+def accumulate_replications(n_cars, runs, seed=None, workers=None, what_if=False, output_dir=None):
+    total = SummaryAccumulator()
+    for result in iter_replications(n_cars, runs, seed, workers, what_if, output_dir):
+        total.merge(result["accumulator"])
+    return total
@@ -0,0 +1,147 @@
+import argparse
+import math
+import numpy as np
+
+import simcore_path  # puts the repo root on sys.path
+from simcore.stats import t_half_width
+from engine import PUMPS, PumpQueue, route_cars, sample_car_chunks, scenario_parameters
+
+# Steady-state estimates from one long run instead of many short ones. Every
+# replication starts with empty pumps, so short runs under-estimate the
+# waits and pay for the warm-up every time. Here the station runs once for
+# n_cars; the cars are summed up in micro-batches of `micro_batch` cars as
+# they go (memory depends on n_cars / micro_batch only), the warm-up is cut
+# off with MSER (the truncation point that minimises the standard error of
+# what is left) and the rest is split into `batches` equal batches whose
+# means give the confidence intervals (batch means).
+#
+#   result = steady_state(1_000_000, seed=1)
+#   print(format_steady_state(result))
+#
+# Queue lengths are time averages of the cars waiting: the waiting time of a
+# batch's cars over the time the batch covers (Little's law).
+
+RESPONSES = ["overall_avg_wait", "overall_avg_queue"] + \
+    [f"avg_wait_{pump}" for pump in PUMPS] + [f"avg_queue_{pump}" for pump in PUMPS]
+
+
+# Runs the station and returns per micro-batch (rows) and pump (columns) the
+# waiting time and cars, plus the arrival time of each micro-batch's first
+# car and of the last car (one more entry). Cars after the last whole
+# micro-batch are dropped.
+def micro_batches(n_cars, seed=None, micro_batch=100, chunk_size=100_000, scenario=None, progress=None):
+    if n_cars < micro_batch:
+        raise ValueError("n_cars must be at least one micro-batch")
+    params = scenario_parameters(scenario)
+    rng = np.random.default_rng(seed)
+    chunk_size = max(micro_batch, chunk_size // micro_batch * micro_batch)  # batches never straddle chunks
+    queues = {pump: PumpQueue(params["servers"].get(pump, 1)) for pump in PUMPS}
+    waits, cars, starts = [], [], []
+    done = 0
+    last_arrival = 0
+    for category_codes, _, arrival_times, service_times, divert_rand in \
+            sample_car_chunks(rng, n_cars // micro_batch * micro_batch, chunk_size, scenario=params):
+        report = None if progress is None else (lambda i, _, done=done: progress(done + i, n_cars))
+        service_begins, pumps, _ = route_cars(category_codes.tolist(), arrival_times.tolist(),
+                                              service_times.tolist(), divert_rand.tolist(),
+                                              progress=report, queues=queues, routing=params)
+        batch = np.arange(len(pumps)) // micro_batch * len(PUMPS) + np.array(pumps)
+        size = len(pumps) // micro_batch * len(PUMPS)
+        waiting_times = np.array(service_begins) - arrival_times
+        waits.append(np.bincount(batch, weights=waiting_times, minlength=size).reshape(-1, len(PUMPS)))
+        cars.append(np.bincount(batch, minlength=size).reshape(-1, len(PUMPS)))
+        starts.append(arrival_times[::micro_batch])
+        last_arrival = int(arrival_times[-1])
+        done += len(pumps)
+    return np.concatenate(waits), np.concatenate(cars), np.append(np.concatenate(starts), last_arrival)
+
+
+# MSER truncation: the number of leading values d (at most half of them) that
+# minimises the variance of the mean of values[d:], sum((y - mean)^2) / n^2
+def mser(values):
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    tail_sum = np.cumsum(values[::-1])[::-1]
+    tail_squares = np.cumsum(values[::-1] ** 2)[::-1]
+    kept = n - np.arange(n)
+    statistic = (tail_squares - tail_sum ** 2 / kept) / kept ** 2
+    return int(np.argmin(statistic[:n // 2 + 1]))
+
+
+# the responses of a group of micro-batches, from their sums
+def _responses(waits, cars, duration):
+    total_cars = cars.sum(axis=-1)
+    total_wait = waits.sum(axis=-1)
+    result = {"overall_avg_wait": total_wait / total_cars, "overall_avg_queue": total_wait / duration}
+    for code, pump in enumerate(PUMPS):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result[f"avg_wait_{pump}"] = waits[..., code] / cars[..., code]
+        result[f"avg_queue_{pump}"] = waits[..., code] / duration
+    return result
+
+
+# One long run, MSER on the micro-batch mean waits, batch means on the rest.
+# Every response comes back as (mean, half width); lag1 is the
+# autocorrelation of the overall-wait batch means, near 0 when the batches are
+# long enough to be treated as independent.
+def steady_state(n_cars, seed=None, batches=20, micro_batch=100, level=0.95, scenario=None, progress=None):
+    waits, cars, starts = micro_batches(n_cars, seed, micro_batch, scenario=scenario, progress=progress)
+    durations = np.diff(starts)
+    warmup = mser(waits.sum(axis=1) / cars.sum(axis=1))
+    per_batch = (len(waits) - warmup) // batches
+    if per_batch < 1:
+        raise ValueError(f"too few cars left after the warm-up for {batches} batches of {micro_batch}")
+    # whole batches only, the micro-batches left over come off the warm-up end
+    first = len(waits) - per_batch * batches
+    shape = (batches, per_batch, len(PUMPS))
+    batch_waits = waits[first:].reshape(shape).sum(axis=1)
+    batch_cars = cars[first:].reshape(shape).sum(axis=1)
+    batch_durations = durations[first:].reshape(batches, per_batch).sum(axis=1)
+    values = _responses(batch_waits, batch_cars, batch_durations)
+    pooled = _responses(batch_waits.sum(axis=0), batch_cars.sum(axis=0), batch_durations.sum())
+
+    estimates = {}
+    for name in RESPONSES:
+        observations = values[name][~np.isnan(values[name])]
+        estimates[name] = (float(pooled[name]), t_half_width(observations.std(ddof=1), len(observations), level))
+    overall = values["overall_avg_wait"]
+    return {
+        "n_cars": int(cars.sum()),
+        "warmup_cars": int(cars[:first].sum()),
+        "warmup_time": int(starts[first] - starts[0]),
+        "batches": batches,
+        "batch_cars": per_batch * micro_batch,
+        "lag1": float(np.corrcoef(overall[:-1], overall[1:])[0, 1]) if batches > 2 else math.nan,
+        "estimates": estimates,
+        "level": level,
+    }
+
+
+def format_steady_state(result):
+    lines = [f"Steady state from one run of {result['n_cars']} cars:",
+             f"   warm-up cut (MSER): {result['warmup_cars']} cars, {result['warmup_time']} minutes",
+             f"   {result['batches']} batches of {result['batch_cars']} cars,"
+             f" lag-1 autocorrelation of the batch means {result['lag1']:.2f}", ""]
+    for name, (mean, half) in result["estimates"].items():
+        lines.append(f"   {name:<22}{mean:>9.3f} +- {half:.3f}")
+    if result["lag1"] > 0.2:
+        lines += ["", "   The batch means are still correlated: run more cars or use fewer batches."]
+    return "\n".join(lines) + "\n"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Steady-state waits of the petrol station from one long run.")
+    parser.add_argument("--cars", type=int, default=1_000_000, help="length of the run in cars")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the run")
+    parser.add_argument("--batches", type=int, default=20, help="number of batches for the batch means")
+    parser.add_argument("--micro-batch", type=int, default=100, help="cars summed up together during the run")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    print(format_steady_state(steady_state(args.cars, args.seed, args.batches, args.micro_batch)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+from engine import CATEGORIES, PUMPS, compact_ints, group_codes
+
+# Columnar binary store for per-car results. Every run is a folder with one
+# .npy file per column, and index.json lists the runs and their row counts:
+#
+#   Simulation_Results/
+#       index.json
+#       run_00001/category.npy  arrival_time.npy  ...  pump.npy
+#       run_00002/...
+#
+# Category and Pump are stored as int8 codes into CATEGORIES / PUMPS. Files are
+# opened memory-mapped, so an analysis over thousands of runs only pages in
+# the columns and runs it touches. Compared with data.to_string() a run is
+# about 3x smaller on disk and needs no parsing to read back.
+
+INDEX_FILE = "index.json"
+
+# DataFrame column -> (file name, dtype on disk). Car is just 1..rows and is
+# not stored.
+SCHEMA = {
+    "Category": ("category", np.int8),
+    "Arrival Time": ("arrival_time", np.int64),
+    "Service Time": ("service_time", np.int16),
+    "Service Begins": ("service_begins", np.int64),
+    "Service Ends": ("service_ends", np.int64),
+    "Waiting Time": ("waiting_time", np.int32),
+    "Pump": ("pump", np.int8),
+}
+
+CODED_COLUMNS = {"Category": CATEGORIES, "Pump": PUMPS}
+
+
+def run_folder(directory, run):
+    return os.path.join(directory, f"run_{run:05d}")
+
+
+# writes one run's DataFrame, returns its number of rows
+def write_run(directory, run, data):
+    folder = run_folder(directory, run)
+    os.makedirs(folder, exist_ok=True)
+    for column, (name, dtype) in SCHEMA.items():
+        if column in CODED_COLUMNS:
+            values = group_codes(data[column], CODED_COLUMNS[column])
+        else:
+            values = data[column].to_numpy()
+        np.save(os.path.join(folder, name + ".npy"), values.astype(dtype, copy=False))
+    return len(data)
+
+
+# runs is a list of (run, rows). The index is written to a temporary file and
+# then moved in place so a reader never sees half of it.
+def write_index(directory, runs):
+    index = {
+        "columns": {column: name for column, (name, _) in SCHEMA.items()},
+        "categories": CATEGORIES,
+        "pumps": PUMPS,
+        "runs": [{"run": run, "rows": rows, "folder": os.path.basename(run_folder(directory, run))}
+                 for run, rows in sorted(runs)],
+    }
+    temporary = os.path.join(directory, INDEX_FILE + ".tmp")
+    with open(temporary, "w") as file:
+        json.dump(index, file, indent=1)
+    os.replace(temporary, os.path.join(directory, INDEX_FILE))
+
+
+class ResultStore:
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, INDEX_FILE)) as file:
+            self.index = json.load(file)
+        self.columns = self.index["columns"]
+        self.runs = [entry["run"] for entry in self.index["runs"]]
+        self._folders = {entry["run"]: entry["folder"] for entry in self.index["runs"]}
+        self.rows = {entry["run"]: entry["rows"] for entry in self.index["runs"]}
+
+    def __len__(self):
+        return len(self.runs)
+
+    # memory-mapped array of one column of one run (coded columns stay codes)
+    def column(self, run, column):
+        path = os.path.join(self.directory, self._folders[run], self.columns[column] + ".npy")
+        return np.load(path, mmap_mode="r")
+
+    # yields (run, {column: memmap}) for every run, only the asked columns
+    def iter_runs(self, columns=None):
+        columns = columns or list(self.columns)
+        for run in self.runs:
+            yield run, {column: self.column(run, column) for column in columns}
+
+    # loads one run back into the DataFrame run_simulation() returned
+    def read_run(self, run):
+        data = {"Car": np.arange(1, self.rows[run] + 1, dtype=np.int32)}
+        for column in self.columns:
+            values = np.asarray(self.column(run, column))
+            if column in CODED_COLUMNS:
+                values = pd.Categorical.from_codes(values, CODED_COLUMNS[column])
+            else:
+                values = compact_ints(values.astype(np.int64))
+            data[column] = values
+        return pd.DataFrame(data)
+
+    # mean of a column per group over every run, streaming one run at a time,
+    # e.g. store.group_mean("Waiting Time", "Pump")
+    def group_mean(self, column, by):
+        keys = CODED_COLUMNS[by]
+        total = np.zeros(len(keys))
+        count = np.zeros(len(keys), dtype=np.int64)
+        for _, arrays in self.iter_runs([column, by]):
+            total += np.bincount(arrays[by], weights=arrays[column], minlength=len(keys))
+            count += np.bincount(arrays[by], minlength=len(keys))
+        return {key: total[i] / count[i] if count[i] else float("nan") for i, key in enumerate(keys)}
@@ -0,0 +1,178 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+
+import simcore_path  # puts the repo root on sys.path
+from simcore.stats import t_half_width
+from engine import PUMPS, run_simulation, scenario_parameters, summary_row
+from replications import spawn_seeds
+
+# Scenario sweeps of the petrol station without the GUI.
+#   python sweep.py --cars 10000 --runs 5 --grid divert_90=0.2,0.6,1 --grid threshold_90=2,3,4
+#   python sweep.py --cars 10000 --runs 5 --lhs 40 --range divert_90=0:1 --range threshold_gas=2:8
+#   python sweep.py --cars 10000 --scenarios scenarios.json --output sweep.csv
+# A design point is a scenario of engine.scenario_parameters() (routing
+# values, tables, servers), plus servers_<pump> for a number of pumps and
+# n_cars to change the run length. Every (point, replication) is one job on
+# the process pool; the longest jobs go first, so one long scenario does not
+# finish alone at the end. Replication r of every point uses the same random
+# stream (common random numbers), which makes the differences between points
+# much less noisy than their values. The result is one table, a row per
+# point: its parameters, the number of runs, the mean of every summary_row
+# metric and the 95% CI half-width of the waiting times.
+
+INTEGER_PARAMETERS = {"threshold_90", "threshold_gas", "n_cars"} | {f"servers_{pump}" for pump in PUMPS}
+HALF_WIDTH_METRICS = ["overall_avg_wait"] + [f"avg_wait_{pump}" for pump in PUMPS]
+
+
+# every combination of the levels, {name: [values]}
+def grid_design(levels):
+    names = list(levels)
+    return [dict(zip(names, values)) for values in itertools.product(*(levels[name] for name in names))]
+
+
+# Latin hypercube of `samples` points, {name: (low, high)}: every parameter's
+# range is cut into `samples` equal strata and each stratum is used once.
+# Integer parameters take every whole value from low to high equally often.
+def lhs_design(bounds, samples, seed=None):
+    rng = np.random.default_rng(seed)
+    design = [{} for _ in range(samples)]
+    for name, (low, high) in bounds.items():
+        points = (rng.permutation(samples) + rng.random(samples)) / samples
+        for scenario, point in zip(design, points):
+            if name in INTEGER_PARAMETERS:
+                scenario[name] = int(low + min(int(point * (high - low + 1)), high - low))
+            else:
+                scenario[name] = float(low + point * (high - low))
+    return design
+
+
+# (n_cars, scenario) of a design point
+def split_point(point, n_cars):
+    scenario = dict(point)
+    n_cars = scenario.pop("n_cars", n_cars)
+    servers = {name[len("servers_"):]: scenario.pop(name) for name in list(scenario) if name.startswith("servers_")}
+    if servers:
+        scenario["servers"] = dict(scenario.get("servers", {}), **servers)
+    scenario_parameters(scenario)  # unknown names fail here and not in a worker
+    return n_cars, scenario
+
+
+def _run_point(job):
+    index, run, n_cars, seed_sequence, scenario = job
+    _, stats = run_simulation(n_cars, seed_sequence, what_if=False, scenario=scenario)
+    return index, run, summary_row(stats)
+
+
+# runs every point of the design `runs` times and returns the consolidated
+# table. progress(done, total) after every job.
+def run_sweep(design, n_cars, runs=1, seed=None, workers=None, progress=None):
+    points = [split_point(point, n_cars) for point in design]
+    seeds = spawn_seeds(seed, runs)
+    jobs = [(index, run, cars, seeds[run - 1], scenario)
+            for index, (cars, scenario) in enumerate(points) for run in range(1, runs + 1)]
+    # routing takes about the same time per car, so the cost of a job is its cars
+    jobs.sort(key=lambda job: -job[2])
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(jobs))
+
+    rows = []
+    if workers <= 1:
+        results = map(_run_point, jobs)
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        results = (future.result() for future in as_completed([executor.submit(_run_point, job) for job in jobs]))
+    try:
+        for index, run, summary in results:
+            rows.append(dict(summary, point=index, run=run))
+            if progress is not None:
+                progress(len(rows), len(jobs))
+    finally:
+        if workers > 1:
+            executor.shutdown(wait=True, cancel_futures=True)
+    return consolidate(design, [cars for cars, _ in points], rows)
+
+
+# one row per design point from the per-run summary rows
+def consolidate(design, n_cars, rows):
+    runs = pd.DataFrame(rows).sort_values(["point", "run"])
+    metrics = [column for column in runs.columns if column not in ("point", "run", "n_cars")]
+    grouped = runs.groupby("point")[metrics]
+    table = grouped.mean().round(4)
+    counts = grouped.count()
+    stds = grouped.std()
+    for metric in HALF_WIDTH_METRICS:
+        table[f"{metric}_hw"] = [t_half_width(std, count) for std, count in zip(stds[metric], counts[metric])]
+    parameters = pd.DataFrame([{name: _cell(value) for name, value in point.items() if name != "n_cars"}
+                               for point in design], index=range(len(design)))
+    parameters["n_cars"] = n_cars
+    parameters["runs"] = runs.groupby("point").size().reindex(range(len(design))).to_numpy()
+    return pd.concat([parameters, table.reset_index(drop=True)], axis=1)
+
+
+# tables and server dicts as JSON text in the table, numbers as they are
+def _cell(value):
+    return json.dumps(value) if isinstance(value, (list, dict)) else value
+
+
+def _parse_value(text):
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep petrol station scenarios over a process pool.")
+    parser.add_argument("--cars", type=int, default=10_000, help="number of cars per run (n_cars in a point wins)")
+    parser.add_argument("--runs", type=int, default=1, help="replications per design point")
+    parser.add_argument("--seed", type=int, default=None, help="master seed, shared by every point")
+    parser.add_argument("--workers", type=int, default=None, help="number of processes (default: all cores)")
+    parser.add_argument("--grid", action="append", default=[], metavar="NAME=V1,V2,...",
+                        help="levels of one parameter, every combination is run (repeatable)")
+    parser.add_argument("--lhs", type=int, default=None, metavar="N", help="Latin hypercube of N points over --range")
+    parser.add_argument("--range", action="append", default=[], metavar="NAME=LOW:HIGH",
+                        help="range of one parameter for --lhs (repeatable)")
+    parser.add_argument("--scenarios", default=None, help="JSON file with a list of design points")
+    parser.add_argument("--output", default="-", help="CSV file to write, '-' for stdout")
+    args = parser.parse_args(argv)
+    try:
+        args.grid = {name: [_parse_value(value) for value in values.split(",")]
+                     for name, values in (item.split("=") for item in args.grid)}
+        args.range = {name: tuple(_parse_value(value) for value in bounds.split(":"))
+                      for name, bounds in (item.split("=") for item in args.range)}
+    except ValueError:
+        parser.error("use NAME=V1,V2 for --grid and NAME=LOW:HIGH for --range")
+    if sum(map(bool, (args.grid, args.lhs, args.scenarios))) != 1:
+        parser.error("give exactly one of --grid, --lhs or --scenarios")
+    if args.lhs and not args.range:
+        parser.error("--lhs needs at least one --range")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.scenarios:
+        with open(args.scenarios) as file:
+            design = json.load(file)
+    elif args.lhs:
+        design = lhs_design(args.range, args.lhs, args.seed)
+    else:
+        design = grid_design(args.grid)
+    progress = lambda done, total: print(f"{done}/{total} runs", end="\r", file=sys.stderr)
+    try:
+        table = run_sweep(design, args.cars, args.runs, args.seed, args.workers, progress)
+    except ValueError as error:
+        sys.exit(f"sweep.py: {error}")
+    print(file=sys.stderr)
+    table.to_csv(sys.stdout if args.output == "-" else args.output, index=False)
+
+
+if __name__ == "__main__":
+    main()
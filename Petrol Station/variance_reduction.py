@@ -0,0 +1,147 @@
+import argparse
+import math
+import numpy as np
+
+import simcore_path  # puts the repo root on sys.path
+from simcore.stats import t_quantile
+from engine import CATEGORIES, PUMPS, category_table, group_codes, inter_arrival_table, service_time_tables, \
+    theoretical_average
+
+# Variance reduction for the multi-run estimates. The model's input means are
+# known exactly (theoretical_average of the tables), so every run also
+# measures how lucky its draws were: its mean inter-arrival time, its mean
+# service time and its share of category A and B cars against the theoretical
+# ones. The shares matter most, B cars are the ones that switch pumps and the
+# categories' service times differ a lot. Regressing a
+# response (e.g. the average waiting time) on these controls and correcting
+# for their error is the control variate estimator; runs drawn in antithetic
+# pairs (u and 1 - u, see engine.sample_cars) cancel part of the noise as
+# well. Both keep the estimate unbiased and give a narrower confidence
+# interval for the same number of runs.
+#
+#   measures = [result["measures"] for result in iter_replications(10000, 40, seed=1, antithetic=True)]
+#   for row in compare_estimators(measures, "overall_avg_wait", antithetic=True): ...
+
+RESPONSES = ["overall_avg_wait", "overall_avg_queue"] + [f"avg_wait_{pump}" for pump in PUMPS]
+# the last category's share is 1 minus the others, it would add nothing
+CONTROLS = ["avg_inter_arrival", "avg_service"] + [f"share_{category}" for category in CATEGORIES[:-1]]
+
+
+# exact expectations of the controls, in the order of CONTROLS
+def control_means():
+    shares = np.diff([0.0] + [prob for _, prob in category_table])
+    service = sum(share * theoretical_average(service_time_tables[category])
+                  for share, category in zip(shares, CATEGORIES))
+    return np.array([theoretical_average(inter_arrival_table), service] + list(shares[:-1]))
+
+
+# unrounded responses and controls of one run's per-car table
+def run_measures(data):
+    n_cars = len(data)
+    categories = group_codes(data["Category"], CATEGORIES)
+    pumps = group_codes(data["Pump"], PUMPS)
+    waiting = data["Waiting Time"].to_numpy().astype(float)
+    end_time = float(data["Service Ends"].max())
+    cars_per_pump = np.bincount(pumps, minlength=len(PUMPS))
+    waiting_per_pump = np.bincount(pumps, weights=waiting, minlength=len(PUMPS))
+    cars_per_category = np.bincount(categories, minlength=len(CATEGORIES))
+
+    measures = {"overall_avg_wait": waiting.mean(), "overall_avg_queue": waiting.sum() / end_time}
+    for code, pump in enumerate(PUMPS):
+        measures[f"avg_wait_{pump}"] = waiting_per_pump[code] / cars_per_pump[code] if cars_per_pump[code] else 0.0
+    # arrival times start at 0, so the last one over the number of cars is
+    # the run's mean inter-arrival time
+    measures["avg_inter_arrival"] = float(data["Arrival Time"].iloc[-1]) / n_cars
+    measures["avg_service"] = float(data["Service Time"].mean())
+    for code, category in enumerate(CATEGORIES[:-1]):
+        measures[f"share_{category}"] = cars_per_category[code] / n_cars
+    return measures
+
+
+def _estimate(name, values, level):
+    n = len(values)
+    mean = float(np.mean(values))
+    variance = float(np.var(values, ddof=1)) / n if n > 1 else math.nan
+    half = t_quantile(0.5 + level / 2, n - 1) * math.sqrt(variance) if n > 1 else math.nan
+    return {"estimator": name, "mean": mean, "half_width": half, "variance": variance}
+
+
+# Control variate estimate of the mean of `values` (one per run or pair) with
+# the controls of the same runs (one row each) and their known means. Its
+# variance is the residual variance times the Lavenberg-Welch factor, with
+# n - q - 1 degrees of freedom for q controls.
+def control_variate_estimate(values, controls, means, level=0.95, name="control variates"):
+    values = np.asarray(values, dtype=float)
+    controls = np.asarray(controls, dtype=float)
+    n, q = controls.shape
+    if n <= q + 2:
+        return {"estimator": name, "mean": float(values.mean()), "half_width": math.nan, "variance": math.nan}
+    centered = controls - controls.mean(axis=0)
+    beta, *_ = np.linalg.lstsq(centered, values - values.mean(), rcond=None)
+    offset = controls.mean(axis=0) - means
+    mean = float(values.mean() - offset @ beta)
+    residuals = values - values.mean() - centered @ beta
+    residual_variance = float(residuals @ residuals) / (n - q - 1)
+    factor = 1 / n + offset @ np.linalg.pinv(centered.T @ centered) @ offset
+    variance = residual_variance * factor
+    half = t_quantile(0.5 + level / 2, n - q - 1) * math.sqrt(variance)
+    return {"estimator": name, "mean": mean, "half_width": half, "variance": variance, "beta": beta}
+
+
+# Plain, antithetic and control variate estimates of one response from the
+# measures of every run (in run order; with antithetic=True runs 2k - 1 and 2k
+# are a pair). "reduction" is how many times smaller the variance of the
+# estimate is than with the same number of independent runs, i.e. how many
+# times more plain runs the same interval would take.
+def compare_estimators(measures, response, antithetic=False, level=0.95):
+    values = np.array([measure[response] for measure in measures])
+    controls = np.array([[measure[name] for name in CONTROLS] for measure in measures])
+    means = control_means()
+    n = len(values)
+    # what n independent runs would give; every run on its own is an ordinary run
+    independent_variance = float(np.var(values, ddof=1)) / n if n > 1 else math.nan
+    rows = [_estimate("independent runs", values, level)]
+    if antithetic:
+        pairs = n // 2
+        pair_values = values[:2 * pairs].reshape(pairs, 2).mean(axis=1)
+        pair_controls = controls[:2 * pairs].reshape(pairs, 2, -1).mean(axis=1)
+        if pairs > 1:
+            rows.append(_estimate("antithetic pairs", pair_values, level))
+        rows.append(control_variate_estimate(pair_values, pair_controls, means, level,
+                                             "antithetic + control variates"))
+    else:
+        rows.append(control_variate_estimate(values, controls, means, level))
+    for row in rows:
+        row["reduction"] = independent_variance / row["variance"] if row["variance"] else math.nan
+    return rows
+
+
+def format_comparison(rows, response):
+    lines = [f"{response}:"]
+    for row in rows:
+        lines.append(f"   {row['estimator']:<32}{row['mean']:>9.3f} +- {row['half_width']:<8.3f}"
+                     f" variance reduction x{row['reduction']:.1f}")
+    return "\n".join(lines)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compare variance reduction estimators on petrol station runs.")
+    parser.add_argument("--cars", type=int, default=10_000, help="number of cars per run")
+    parser.add_argument("--runs", type=int, default=40, help="number of runs")
+    parser.add_argument("--seed", type=int, default=None, help="master seed")
+    parser.add_argument("--antithetic", action="store_true", help="draw the runs in antithetic pairs")
+    parser.add_argument("--workers", type=int, default=None, help="number of processes (default: all cores)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from replications import iter_replications
+    args = parse_args(argv)
+    measures = [result["measures"] for result in
+                iter_replications(args.cars, args.runs, args.seed, args.workers, antithetic=args.antithetic)]
+    for response in RESPONSES:
+        print(format_comparison(compare_estimators(measures, response, args.antithetic), response))
+
+
+if __name__ == "__main__":
+    main()
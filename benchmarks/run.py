@@ -0,0 +1,188 @@
+import argparse
+import atexit
+import gc
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)  # for simcore
+sys.path.insert(0, os.path.join(BASE_DIR, "Petrol Station"))
+sys.path.insert(0, os.path.join(BASE_DIR, "hospital inventory system"))
+
+# Benchmarks of both simulations, without a display.
+#   python benchmarks/run.py                  compare with baseline.json
+#   python benchmarks/run.py --save-baseline  store this machine's numbers
+#   python benchmarks/run.py --only petrol --sizes 1000 10000000
+# Every benchmark reports its throughput (best of --repeats timed runs) and
+# its peak traced memory (one more run under tracemalloc, which is slower, so
+# it is not timed). A benchmark regresses when its throughput drops, or its
+# peak memory grows, by more than --threshold against the baseline; the exit
+# code is then 1. Baselines only make sense on the machine that stored them.
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+
+# Each benchmark is (name, unit, amount, make) where make() does the set-up
+# and returns the function to time; `amount` units of work per call.
+def petrol_benchmarks(sizes):
+    from engine import run_simulation, run_summary
+    from replications import iter_replications
+    benchmarks = []
+    for n_cars in sizes:
+        benchmarks.append((f"petrol.run_simulation[{n_cars}]", "cars/s", n_cars,
+                           lambda n_cars=n_cars: lambda: run_simulation(n_cars, seed=1, what_if=False)))
+    benchmarks.append(("petrol.run_summary[1000000]", "cars/s", 1_000_000,
+                       lambda: lambda: run_summary(1_000_000, seed=1)))
+    benchmarks.append(("petrol.run_simulation_what_if[10000]", "cars/s", 10_000,
+                       lambda: lambda: run_simulation(10_000, seed=1, what_if=True, workers=1)))
+
+    # what "Run Multiple Simulations" does: replications saved to the store
+    def replications():
+        directory = tempfile.mkdtemp()
+        atexit.register(shutil.rmtree, directory, True)
+        return lambda: list(iter_replications(10_000, 8, seed=1, workers=1, output_dir=directory))
+    benchmarks.append(("petrol.replications[8x10000]", "runs/s", 8, replications))
+
+    # the text the GUI shows for a single run
+    def render_text():
+        from engine import format_statistics
+        data, stats = run_simulation(100_000, seed=1, what_if=False)
+        return lambda: data.to_string() + "\n\n" + format_statistics(stats)
+    benchmarks.append(("petrol.render_text[100000]", "cars/s", 100_000, render_text))
+    return benchmarks
+
+
+def inventory_benchmarks():
+    import inventory
+    from policy_grid import optimal_combination
+    from selection import adaptive_optimal_combination
+    from day_stream import runSimStream
+    benchmarks = [
+        ("inventory.runSim[100000 days]", "days/s", 100_000, lambda: lambda: inventory.runSim(100_000, seed=1)),
+        ("inventory.runSimStream[1000000 days]", "days/s", 1_000_000,
+         lambda: lambda: runSimStream(1_000_000, seed=1)),
+        ("inventory.run_batch[10000x365]", "days/s", 3_650_000,
+         lambda: lambda: inventory.run_batch(10_000, 365, rng=inventory.np.random.default_rng(1))),
+        ("inventory.find_best_value(find_optimal_combination)", "calls/s", 1,
+         lambda: lambda: inventory.find_best_value(inventory.find_optimal_combination)),
+        ("inventory.optimal_combination", "calls/s", 1, lambda: lambda: optimal_combination(seed=1, workers=1)),
+        ("inventory.adaptive_optimal_combination", "calls/s", 1,
+         lambda: lambda: adaptive_optimal_combination(seed=1)),
+    ]
+
+    # what the GUI's table does with a 100k-day run, needs a display
+    def render_table():
+        import tkinter as tk
+        from simcore.virtual_table import VirtualTable
+        root = tk.Tk()
+        root.withdraw()
+        table = VirtualTable(root, visible_rows=20)
+        data, _ = inventory.runSim(100_000, seed=1)
+
+        def render():
+            table.set_data(data)
+            for top in range(0, len(data), len(data) // 100):
+                table.scroll_to(top)
+            root.update_idletasks()
+        return render
+    benchmarks.append(("inventory.render_table[100000 days]", "days/s", 100_000, render_table))
+    return benchmarks
+
+
+# best of at least `repeats` runs, more for short benchmarks until they have
+# run for min_seconds in total (timer noise swamps a single 10 ms run)
+def measure(make, amount, repeats, min_seconds=1.0):
+    function = make()
+    best = float("inf")
+    runs = 0
+    spent = 0.0
+    while runs < repeats or (spent < min_seconds and runs < 100):
+        gc.collect()
+        started = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - started
+        best = min(best, elapsed)
+        spent += elapsed
+        runs += 1
+    gc.collect()
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": best, "throughput": amount / best, "peak_mb": peak / 2 ** 20}
+
+
+# list of (name, message) for every benchmark worse than the baseline
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        if result["throughput"] < old["throughput"] * (1 - threshold):
+            regressions.append((name, f"throughput {result['throughput']:.4g} < {old['throughput']:.4g}"))
+        # a few MB either way is noise of the allocator, not of the code
+        if result["peak_mb"] > old["peak_mb"] * (1 + threshold) + 1:
+            regressions.append((name, f"peak memory {result['peak_mb']:.1f} MB > {old['peak_mb']:.1f} MB"))
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark both simulations.")
+    parser.add_argument("--only", nargs="*", default=[], help="run only benchmarks whose name contains one of these")
+    parser.add_argument("--sizes", nargs="*", type=int, default=DEFAULT_SIZES,
+                        help="numbers of cars for run_simulation (10000000 needs a few GB)")
+    parser.add_argument("--repeats", type=int, default=3, help="least timed runs per benchmark, the best one counts")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown or memory growth against the baseline (0.25 = 25%%)")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline file to compare with or save to")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    benchmarks = petrol_benchmarks(args.sizes) + inventory_benchmarks()
+    if args.only:
+        benchmarks = [benchmark for benchmark in benchmarks if any(part in benchmark[0] for part in args.only)]
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+
+    results = {}
+    print(f"{'benchmark':<58}{'throughput':>16}{'vs base':>9}{'peak MB':>10}")
+    for name, unit, amount, make in benchmarks:
+        try:
+            result = measure(make, amount, args.repeats)
+        except Exception as error:  # e.g. no display for the Tk benchmark
+            print(f"{name:<58}{'skipped':>16}  ({type(error).__name__}: {error})")
+            continue
+        result["unit"] = unit
+        results[name] = result
+        change = f"{result['throughput'] / baseline[name]['throughput'] - 1:+.0%}" if name in baseline else ""
+        print(f"{name:<58}{result['throughput']:>10.4g} {unit:<6}{change:>8}{result['peak_mb']:>10.1f}")
+
+    if args.save_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w") as file:
+            json.dump({"machine": platform.platform(), "python": platform.python_version(),
+                       "results": baseline}, file, indent=1)
+        print(f"baseline saved to {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    for name, message in regressions:
+        print(f"REGRESSION {name}: {message}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+import argparse
+import csv
+import numpy as np
+
+import simcore_path  # puts the repo root on sys.path
+from simcore import instrument
+from inventory import DAY_COLUMNS, NO_ORDER, check_review_period, compile_table, lead_time_table, \
+    rooms_occupied_table, theoretical_mean, use_stock
+
+# runSim for horizons too long to keep in memory. The days come out in chunks
+# of chunk_size rows (an int32 array with the columns of DAY_COLUMNS, no
+# order outstanding is NO_ORDER instead of "-") and go to a sink; averages
+# and shortage counters are added up as the days go by. Memory stays the same
+# for 100 days or 100 million.
+#
+#   stats = runSimStream(10_000_000, seed=1, sink=NpySink("run.npy", 10_000_000))
+#
+# The rows and stats are exactly runSim's for the same arguments and seed:
+# the room numbers are drawn a chunk at a time from the same stream, and the
+# lead time numbers, which runSim draws after all the days' room numbers,
+# from a second copy of the stream that first skips that many draws (again a
+# chunk at a time).
+
+
+# A sink takes each chunk with write(chunk) and is closed with close().
+class NullSink:
+    def write(self, chunk):
+        pass
+
+    def close(self):
+        pass
+
+
+# runSim's table as CSV, "-" where no order is outstanding
+class CsvSink:
+    def __init__(self, path):
+        self.file = open(path, "w", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(DAY_COLUMNS)
+
+    def write(self, chunk):
+        rows = chunk.tolist()
+        for row in rows:
+            if row[9] == NO_ORDER:
+                row[9] = "-"
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+# a (days, 10) int32 .npy file, written as the chunks come. Read it back with
+# np.load(path, mmap_mode="r").
+class NpySink:
+    def __init__(self, path, days):
+        self.file = open(path, "wb")
+        header = {"descr": np.lib.format.dtype_to_descr(np.dtype(np.int32)), "fortran_order": False,
+                  "shape": (days, len(DAY_COLUMNS))}
+        np.lib.format.write_array_header_1_0(self.file, header)
+
+    def write(self, chunk):
+        self.file.write(np.ascontiguousarray(chunk, dtype=np.int32).tobytes())
+
+    def close(self):
+        self.file.close()
+
+
+# the runSim stats so far, from the totals of iter_day_chunks()
+def stream_stats(totals):
+    days = totals["days"]
+    lead_times = totals["lead_times"]
+    return {
+        "avg_ff": totals["sum_ff"] // days,
+        "avg_basement": totals["sum_basement"] // days,
+        "total_shortage_days": totals["shortage_days"],
+        "total_basement_shortage": totals["basement_shortage_days"],
+        "experimental_avg_demand": totals["demand"] / days,
+        "experimental_avg_lead_time": totals["sum_lead_time"] / lead_times if lead_times else 0,
+        "theoretical_avg_demand": theoretical_mean(rooms_occupied_table),
+        "theoretical_avg_lead_time": theoretical_mean(lead_time_table),
+        "basement_shortage": totals["basement_shortage"],
+    }
+
+
+# draws the randint(1, 100) numbers of draw_run() a chunk at a time
+def _skip(rng, count, chunk_size):
+    while count > 0:
+        rng.integers(1, 101, size=min(count, chunk_size))
+        count -= chunk_size
+
+
+# Yields the days of runSim in chunks. totals, if given, is kept up to date
+# with the running sums after every chunk.
+def iter_day_chunks(days=20, max_basement_inventory=30, review_period=6, seed=None, chunk_size=10_000,
+                    totals=None):
+    check_review_period(review_period)
+    seed_sequence = np.random.SeedSequence(seed)
+    rooms_rng = np.random.default_rng(seed_sequence)
+    lead_rng = np.random.default_rng(seed_sequence)
+    _skip(lead_rng, days, chunk_size)
+    rooms_values = compile_table(rooms_occupied_table)
+    lead_values = compile_table(lead_time_table)
+
+    totals = totals if totals is not None else {}
+    totals.update(days=0, sum_ff=0, sum_basement=0, shortage_days=0, basement_shortage_days=0, demand=0,
+                  lead_times=0, sum_lead_time=0, basement_shortage=0)
+    ff_inventory = 4
+    basement_inventory = max_basement_inventory
+    basementShortage = 0
+    days_until_review = review_period - 1
+    days_until_order_arrival = NO_ORDER
+
+    for start in range(0, days, chunk_size):
+        end = min(days, start + chunk_size)
+        rooms_rand = rooms_rng.integers(1, 101, size=end - start)
+        demands = rooms_values[rooms_rand].tolist()
+        reviews = end // review_period - start // review_period
+        lead_times = lead_values[lead_rng.integers(1, 101, size=reviews)].tolist()
+        rows = []
+        with instrument.phase("day_stream.days"):
+            for day, rooms, demand in zip(range(start + 1, end + 1), rooms_rand.tolist(), demands):
+                beginningInv = ff_inventory
+                ff_inventory, basement_inventory, shortageFF, new_basement_shortage = use_stock(
+                    demand, ff_inventory, basement_inventory)
+                totals["demand"] += demand
+                if shortageFF:
+                    totals["shortage_days"] += 1
+                if new_basement_shortage:
+                    basementShortage += new_basement_shortage
+                    totals["basement_shortage_days"] += 1
+                if days_until_review == 0:
+                    days_until_order_arrival = lead_times[totals["lead_times"] - start // review_period]
+                    totals["lead_times"] += 1
+                    totals["sum_lead_time"] += days_until_order_arrival
+                totals["sum_ff"] += ff_inventory
+                totals["sum_basement"] += basement_inventory
+                rows.append((day, rooms, demand, beginningInv, shortageFF, ff_inventory, basement_inventory,
+                             basementShortage, days_until_review, days_until_order_arrival))
+
+                if days_until_review > 0:
+                    days_until_review -= 1
+                else:
+                    days_until_review = review_period - 1
+                if days_until_order_arrival != NO_ORDER:
+                    days_until_order_arrival -= 1
+                    if days_until_order_arrival == 0:
+                        temp_basement = max_basement_inventory
+                        basement_inventory = max(0, max_basement_inventory - basementShortage)
+                        basementShortage = max(0, basementShortage - temp_basement)
+                        days_until_order_arrival = NO_ORDER
+        totals["days"] = end
+        totals["basement_shortage"] = basementShortage
+        instrument.count("days", end - start)
+        yield np.array(rows, dtype=np.int32)
+
+
+# runSim's stats, with every chunk of days written to sink (NullSink when
+# None); the sink is closed at the end. progress(done, total) after each chunk.
+def runSimStream(days=20, max_basement_inventory=30, review_period=6, seed=None, sink=None, chunk_size=10_000,
+                 progress=None):
+    if days < 1:
+        raise ValueError("days must be at least 1")
+    check_review_period(review_period)
+    sink = sink if sink is not None else NullSink()
+    totals = {}
+    try:
+        for chunk in iter_day_chunks(days, max_basement_inventory, review_period, seed, chunk_size, totals):
+            with instrument.phase("day_stream.write"):
+                sink.write(chunk)
+            if progress is not None:
+                progress(totals["days"], days)
+    finally:
+        sink.close()
+    return stream_stats(totals)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the inventory model over a long horizon without the GUI.")
+    parser.add_argument("--days", type=int, required=True, help="number of days")
+    parser.add_argument("--max-basement", type=int, default=30, help="basement order-up-to level")
+    parser.add_argument("--review-period", type=int, default=6, help="days between reviews")
+    parser.add_argument("--seed", type=int, default=None, help="seed, the same as runSim's")
+    parser.add_argument("--chunk-size", type=int, default=10_000, help="days per chunk")
+    parser.add_argument("--output", default=None,
+                        help="file for the per-day table: .npy (binary) or .csv; none keeps only the stats")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.output is None:
+        sink = NullSink()
+    elif args.output.endswith(".npy"):
+        sink = NpySink(args.output, args.days)
+    else:
+        sink = CsvSink(args.output)
+    stats = runSimStream(args.days, args.max_basement, args.review_period, args.seed, sink, args.chunk_size)
+    for name, value in stats.items():
+        print(f"{name}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+import simcore_path  # puts the repo root on sys.path
+from simcore.stats import t_half_width
+from inventory import check_review_period, run_batch
+
+# Common random numbers for the inventory optimizers. Instead of drawing new
+# demand for every candidate policy (and then repeating the whole search 200
+# times to get a stable answer), R demand and lead-time streams are drawn once
+# and every (max_basement, review_period) pair is run on the same streams with
+# the batched kernel. Differences between policies are then differences in the
+# policies, not in the luck of the draw, and the whole grid costs one kernel
+# call per pair.
+
+
+# randint(1, 100) draws for R replications. Lead draws are indexed by review
+# number, so a policy with fewer reviews just uses the first columns.
+def draw_streams(replications, days, seed=None):
+    rng = np.random.default_rng(seed)
+    rooms_rand = rng.integers(1, 101, size=(replications, days))
+    lead_rand = rng.integers(1, 101, size=(replications, days))
+    return rooms_rand, lead_rand
+
+
+def _evaluate_policy(args):
+    max_basement, review_period, days, rooms_rand, lead_rand = args
+    reviews = days // review_period
+    stats = run_batch(len(rooms_rand), days, max_basement, review_period,
+                      rooms_rand=rooms_rand, lead_rand=lead_rand[:, :reviews])
+    return stats["basement_shortage"], stats["total_basement_shortage"]
+
+
+# Runs every pair of the grid on the same streams, in parallel when workers > 1.
+# Returns (surface, shortages): surface is a DataFrame with one row per pair
+# (mean basement shortage with its 95% confidence bounds, the chance of no
+# shortage and the mean number of shortage days); shortages is an array
+# [max_basement index, review_period index, replication] of the final basement
+# shortage, for the optimizers below.
+def evaluate_grid(max_basements, review_periods, days, replications=200, seed=None, workers=None,
+                  progress=None):
+    check_review_period(review_periods)
+    rooms_rand, lead_rand = draw_streams(replications, days, seed)
+    pairs = [(max_basement, review_period) for max_basement in max_basements for review_period in review_periods]
+    jobs = [(max_basement, review_period, days, rooms_rand, lead_rand) for max_basement, review_period in pairs]
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(jobs))
+    if workers <= 1:
+        results = map(_evaluate_policy, jobs)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        results = executor.map(_evaluate_policy, jobs)
+
+    shortages = np.zeros((len(max_basements), len(review_periods), replications), dtype=np.int64)
+    rows = []
+    try:
+        for done, ((max_basement, review_period), (shortage, shortage_days)) in enumerate(zip(pairs, results), 1):
+            i, j = max_basements.index(max_basement), review_periods.index(review_period)
+            shortages[i, j] = shortage
+            mean = shortage.mean()
+            half = t_half_width(shortage.std(ddof=1), replications)
+            rows.append({
+                "max_basement": max_basement,
+                "review_period": review_period,
+                "mean_shortage": mean,
+                "ci_low": mean - half,
+                "ci_high": mean + half,
+                "p_no_shortage": float((shortage == 0).mean()),
+                "mean_shortage_days": float(shortage_days.mean()),
+            })
+            if progress is not None:
+                progress(done, len(jobs))
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+    return pd.DataFrame(rows), shortages
+
+
+# The three optimizers of the GUI on common random numbers. The original ones
+# stop at the first candidate with no shortage in a single run and take the
+# most common answer of 200 repetitions. Here a candidate counts as having no
+# shortage when it had none in at least `target` of the replications, which
+# is the same rule with the noise taken out. Each returns (answer, surface).
+
+# smallest max basement with no basement shortage in 40 days (review every 6)
+def optimal_max_basement(replications=200, seed=None, workers=None, progress=None, target=0.95):
+    surface, _ = evaluate_grid(list(range(10, 40, 5)), [6], 40, replications, seed, workers, progress)
+    safe = surface[surface["p_no_shortage"] >= target]
+    best = safe.iloc[0] if len(safe) else surface.loc[surface["p_no_shortage"].idxmax()]
+    return int(best["max_basement"]), surface
+
+
+# longest review period before a basement shortage shows up in 20 days
+def optimal_review_period(replications=200, seed=None, workers=None, progress=None, target=0.95):
+    surface, _ = evaluate_grid([30], list(range(5, 15)), 20, replications, seed, workers, progress)
+    unsafe = surface[surface["p_no_shortage"] < target]
+    if len(unsafe) == 0:
+        return int(surface["review_period"].iloc[-1]), surface
+    return int(unsafe["review_period"].iloc[0]) - 1, surface
+
+
+# first (max_basement, review_period) with no basement shortage in 100 days,
+# or the one with the least shortage
+def optimal_combination(replications=200, seed=None, workers=None, progress=None, target=0.95):
+    surface, _ = evaluate_grid(list(range(20, 40, 2)), list(range(4, 11)), 100, replications, seed, workers,
+                               progress)
+    safe = surface[surface["p_no_shortage"] >= target]  # rows are in the order of the original loops
+    best = safe.iloc[0] if len(safe) else surface.loc[surface["mean_shortage"].idxmin()]
+    return (int(best["max_basement"]), int(best["review_period"])), surface
@@ -0,0 +1,123 @@
+import math
+import numpy as np
+
+from inventory import check_review_period, run_batch
+
+# Adaptive ranking and selection for the (max_basement, review_period) search.
+# find_best_value() spends 200 repetitions on every policy, good or bad. This
+# uses the fully sequential procedure of Kim & Nelson (2001) on common random
+# numbers instead: every policy still in the race is run on the same new batch
+# of demand streams, a policy is dropped as soon as its mean shortage is
+# clearly worse than another one's, and the race stops when one policy is left,
+# when the one with the lowest mean is, with a margin for noise, within `delta`
+# boxes of shortage of every other one left, or when the procedure's bound on
+# replications is reached. The policy with the lowest mean wins (the first in
+# the list on a tie, like find_optimal_combination() stopping at the first
+# policy without shortage); with probability at least 1 - alpha it is within
+# `delta` of the best one.
+
+
+def _kn_constant(alpha, policies, n0):
+    # eta of the KN procedure with first-stage size n0, h^2 = 2 eta (n0 - 1)
+    eta = 0.5 * ((2 * alpha / (policies - 1)) ** (-2 / (n0 - 1)) - 1)
+    return 2 * eta * (n0 - 1)
+
+
+# runs every policy still in the race on the same new streams, all of them in
+# one kernel call (one block of rows per policy)
+def _run_stage(policies, alive, days, rng, replications):
+    rooms_rand = rng.integers(1, 101, size=(replications, days))
+    lead_rand = rng.integers(1, 101, size=(replications, days))
+    max_basements = np.repeat([policies[index][0] for index in alive], replications)
+    review_periods = np.repeat([policies[index][1] for index in alive], replications)
+    stats = run_batch(len(alive) * replications, days, max_basements, review_periods,
+                      rooms_rand=np.tile(rooms_rand, (len(alive), 1)), lead_rand=np.tile(lead_rand, (len(alive), 1)))
+    shortage = stats["basement_shortage"].astype(float).reshape(len(alive), replications)
+    return {index: shortage[position] for position, index in enumerate(alive)}
+
+
+# policies is a list of (max_basement, review_period). Returns a dict with the
+# best policy, the mean shortage and number of replications of every policy and
+# the total number of policy replications that were run.
+def select_best_policy(policies, days=100, delta=1.0, alpha=0.05, n0=20, batch=20, max_replications=2000,
+                       seed=None, progress=None):
+    check_review_period([review_period for _, review_period in policies])
+    rng = np.random.default_rng(seed)
+    k = len(policies)
+    samples = {index: [] for index in range(k)}
+    alive = list(range(k))
+    h2 = _kn_constant(alpha, k, n0) if k > 1 else 0.0
+
+    first = _run_stage(policies, alive, days, rng, n0)
+    for index, values in first.items():
+        samples[index].append(values)
+    # variance of the pairwise differences over the first stage
+    first_matrix = np.array([first[index] for index in range(k)])
+    differences = first_matrix[:, None, :] - first_matrix[None, :, :]
+    variances = differences.var(axis=2, ddof=1)
+
+    replications = n0
+    sums = first_matrix.sum(axis=1)
+    total_runs = k * n0
+    while len(alive) > 1:
+        # check elimination after every replication of the latest stage
+        alive = _eliminate(alive, sums, replications, variances, h2, delta)
+        if progress is not None:
+            progress(k - len(alive), k - 1)
+        if len(alive) == 1 or _indifferent(alive, samples, replications, h2, delta):
+            break
+        # KN never needs more than h^2 S^2 / delta^2 replications for a pair
+        bound = int(math.floor(h2 * variances[np.ix_(alive, alive)].max() / delta ** 2)) + 1
+        if replications >= min(bound, max_replications):
+            break
+        size = min(batch, max_replications - replications)
+        stage = _run_stage(policies, alive, days, rng, size)
+        for index, values in stage.items():
+            samples[index].append(values)
+        for step in range(size):
+            for index in alive:
+                sums[index] += stage[index][step]
+            replications += 1
+            alive = _eliminate(alive, sums, replications, variances, h2, delta)
+            if len(alive) == 1:
+                break
+        total_runs += size * len(stage)
+
+    means = {policies[index]: float(np.concatenate(samples[index]).mean()) for index in range(k)}
+    counts = {policies[index]: sum(len(values) for values in samples[index]) for index in range(k)}
+    best = min(alive, key=lambda index: (sums[index], index))
+    return {"best": policies[best], "means": means, "replications": counts,
+            "total_replications": total_runs, "survivors": [policies[index] for index in alive]}
+
+
+# KN elimination: policy i loses when its mean shortage is above another
+# one's plus the allowance. The lowest mean is never beaten, so at least one
+# policy is always left.
+def _eliminate(alive, sums, replications, variances, h2, delta):
+    means = sums[alive] / replications
+    allowance = np.maximum(0, delta / (2 * replications) *
+                           (h2 * variances[np.ix_(alive, alive)] / delta ** 2 - replications))
+    beaten = (means[:, None] > means[None, :] + allowance).any(axis=1)
+    return [index for index, lost in zip(alive, beaten) if not lost]
+
+
+# True when the lowest mean left is within delta of every other policy left,
+# so it is within delta of the best one: its mean minus each other one's plus
+# h times the standard error of their difference, over all the replications
+# so far (the first stage alone can blow up a rare shortage), is at most
+# delta. Only the pairs with that policy count; telling the others apart
+# from each other would take the race to its replication bound.
+def _indifferent(alive, samples, replications, h2, delta):
+    values = np.array([np.concatenate(samples[index])[:replications] for index in alive])
+    means = values.mean(axis=1)
+    lowest = int(np.argmin(means))
+    differences = values[lowest] - values
+    allowance = np.sqrt(h2 * differences.var(axis=1, ddof=1) / replications)
+    return bool((means[lowest] - means + allowance).max() <= delta)
+
+
+# the search of find_optimal_combination(): max basement 20..38, review 4..10
+def adaptive_optimal_combination(delta=1.0, alpha=0.05, seed=None, progress=None):
+    policies = [(max_basement, review_period) for max_basement in range(20, 40, 2) for review_period in range(4, 11)]
+    result = select_best_policy(policies, days=100, delta=delta, alpha=alpha, seed=seed, progress=progress)
+    return result["best"], result
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# simcore is in the repo root, one folder up. Every module here that uses it
+# imports this module first, so the models can be imported from this folder,
+# run as scripts or loaded by main.py without any other path setup.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
@@ -1,11 +1,18 @@
 import tkinter as tk
 from builtins import *
 from tkinter import ttk, messagebox
-import random
+import os
 import pandas as pd
-from collections import Counter
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
+
+import simcore_path  # puts the repo root on sys.path
+from simcore.background import BackgroundTask
+from simcore.cache import ResultCache, code_version
+from simcore import instrument
+from simcore.virtual_table import VirtualTable
+import inventory
+from inventory import runSim
+from policy_grid import optimal_max_basement, optimal_review_period
+from selection import adaptive_optimal_combination
 
 
 pd.set_option('display.max_columns', None)
@@ -13,179 +20,115 @@ pd.set_option('display.max_rows', None)
 pd.set_option('display.width', None)
 pd.set_option('display.max_colwidth', None)
 
-# Probability tables
-rooms_occupied_table = [
-    (1, 0.10, "01-10"),
-    (2, 0.25, "11-25"),
-    (3, 0.60, "26-60"),
-    (4, 0.80, "61-80"),
-    (5, 1.00, "81-100"),
-]
-
-lead_time_table = [
-    (1, 0.40, "01-40"),
-    (2, 0.75, "41-75"),
-    (3, 1.00, "76-100"),
-]
-
-
-# Helper function
-def get_random_value(randInt, table):
-    rnd = randInt / 100
-    for value, prob, _ in table:
-        if rnd <= prob:
-            return value
-
-
-def theoretical_averages(table):
-    total = 0
-    for i in range(len(table)):
-        value, prob, _ = table[i]
-        if i == 0:
-            total += value * prob
-        else:
-            total += value * (prob - table[i - 1][1])
-    
-    return total
-
-
-def runSim(days= 20, max_basement_inventory= 30, review_period = 6):
-    max_ff_inventory = 10
-    ff_inventory = 4
-    basement_inventory = max_basement_inventory
-    shortageFF = 0
-    days_until_review = review_period - 1
-    days_until_order_arrival = "-"
-    basementShortage = 0
-    total_demand = 0
-    total_shortage_days = 0
-    total_basement_shortage_days = 0
-    lead_times = []
-    daily_demand = []
-
-    columns = ["Day", "NumOfRooms Rand", "Rooms Occupied (Boxes Demand)",
-               "Beginning FF Inventory", "Shortage", "Ending FF Inventory",
-               "Basement Inventory", "Basement Shortage", "Days Until Review",
-               "Days Until Order Arrival"]
-
-    simulation_data = []
-
-    for day in range(1, days + 1):
-        shortageFF = 0
-        beginningInv = ff_inventory
-        rooms_rand = random.randint(1, 100)
-        demand = get_random_value(rooms_rand, rooms_occupied_table)
-        total_demand += demand
-        daily_demand.append(demand)
-
-        if ff_inventory >= demand:
-            ff_inventory -= demand
-            if ff_inventory == 0:
-                ff_inventory += min(10, basement_inventory)
-                basement_inventory -= min(10, basement_inventory)
-        else:
-            shortageFF = demand - ff_inventory
-            total_shortage_days += 1
-            if basement_inventory > 0:
-                ff_inventory += min(10, basement_inventory)
-                basement_inventory -= min(10, basement_inventory)
-                if demand > ff_inventory:
-                    basementShortage += demand - ff_inventory
-                    total_basement_shortage_days += 1
-                ff_inventory = max(0, ff_inventory - demand)
-            elif basement_inventory == 0:
-                basementShortage += demand - ff_inventory
-                total_basement_shortage_days += 1
-                ff_inventory = 0
-
-        if days_until_review == 0:
-            lead_time_rand = random.randint(1, 100)
-            lead_time = get_random_value(lead_time_rand, lead_time_table)
-            lead_times.append(lead_time)
-            days_until_order_arrival = lead_time
-        else:
-            lead_time_rand = "-"
-
-        endingInv = ff_inventory
-
-        simulation_data.append([
-            day, rooms_rand, demand, beginningInv, shortageFF, endingInv,
-            basement_inventory, basementShortage, days_until_review, days_until_order_arrival
-        ])
-
-        if days_until_review > 0:
-            days_until_review -= 1
-        else:
-            days_until_review = review_period - 1
-
-        if isinstance(days_until_order_arrival, int):
-            days_until_order_arrival -= 1
-            if days_until_order_arrival == 0:
-                basement_inventory = max_basement_inventory
-                temp_basement = basement_inventory
-                basement_inventory = max(0, basement_inventory - basementShortage)
-                basementShortage = max(0, basementShortage - temp_basement)
-                days_until_order_arrival = "-"
-
-    simulation_df = pd.DataFrame(simulation_data, columns=columns)
-
-    avgFF = sum(row[5] for row in simulation_data) // len(simulation_data)
-    avgBasement = sum(row[6] for row in simulation_data) // len(simulation_data)
-    experimental_avg_demand = total_demand / days
-    experimental_avg_lead_time = sum(lead_times) / len(lead_times) if lead_times else 0
-    theoretical_avg_demand = theoretical_averages(rooms_occupied_table)
-    theoretical_avg_lead_time = theoretical_averages(lead_time_table)
-
-    return simulation_df, {
-        "avg_ff": avgFF,
-        "avg_basement": avgBasement,
-        "total_shortage_days": total_shortage_days,
-        "total_basement_shortage": total_basement_shortage_days,
-        "experimental_avg_demand": experimental_avg_demand,
-        "experimental_avg_lead_time": experimental_avg_lead_time,
-        "theoretical_avg_demand": theoretical_avg_demand,
-        "theoretical_avg_lead_time": theoretical_avg_lead_time,
-        "basement_shortage": basementShortage
+HERE = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(HERE, ".cache")
+# results are dropped when any of the model files change
+MODEL_VERSION = code_version(*(os.path.join(HERE, name) for name in ("inventory.py", "policy_grid.py", "selection.py")))
+# the optimizations do not depend on the inputs, with a fixed seed they are
+# computed once and then come from the cache
+OPTIMIZER_SEED = 2024
+
+
+def model_tables():
+    return {"rooms_occupied_table": inventory.rooms_occupied_table, "lead_time_table": inventory.lead_time_table}
+
+def format_single_stats(stats, optimal_max_basement="...", optimal_review_period="...", optimal_combination="..."):
+    return (
+        f"Average FF Inventory: {stats['avg_ff']}\n"
+        f"Average Basement Inventory: {stats['avg_basement']}\n"
+        f"Total Shortage Days: {stats['total_shortage_days']}\n"
+        f"Total Basement Shortage Days: {stats['total_basement_shortage']}\n"
+        f"Experimental Avg Demand: {stats['experimental_avg_demand']:.2f}\n"
+        f"Experimental Avg Lead Time: {stats['experimental_avg_lead_time']:.2f}\n"
+        f"Theoretical Avg Demand: {stats['theoretical_avg_demand']:.2f}\n"
+        f"Theoretical Avg Lead Time: {stats['theoretical_avg_lead_time']:.2f}\n"
+        f"Optimal Max Basement: {optimal_max_basement}\n"
+        f"Optimal Review Period: {optimal_review_period}\n"
+        f"Optimal Combination: {optimal_combination}\n"
+    )
+
+
+# Work done on the background thread, reported through progress(done, total, partial)
+def simulate_single_run(progress, days, max_basement, review_period, seed=None, cache=None, replications=200):
+    with instrument.run_profile("inventory single run"):
+        return _simulate_single_run(progress, days, max_basement, review_period, seed, cache, replications)
+
+
+def _simulate_single_run(progress, days, max_basement, review_period, seed, cache, replications):
+    cache = cache if cache is not None else ResultCache()
+    tables = model_tables()
+    with instrument.phase("runSim"):
+        simulation_df, stats = cache.call(lambda: runSim(days, max_basement, review_period, seed), "runSim",
+                                          MODEL_VERSION, days=days, max_basement=max_basement,
+                                          review_period=review_period, seed=seed, **tables)
+    optimizers = [
+        # every candidate policy is scored on the same demand streams (policy_grid.py)
+        ("optimal_max_basement",
+         lambda report: optimal_max_basement(replications, seed=OPTIMIZER_SEED, progress=report)),
+        ("optimal_review_period",
+         lambda report: optimal_review_period(replications, seed=OPTIMIZER_SEED, progress=report)),
+        # replications go to the close contenders only (selection.py)
+        ("adaptive_optimal_combination",
+         lambda report: adaptive_optimal_combination(seed=OPTIMIZER_SEED, progress=report)),
+    ]
+    total = len(optimizers)
+    # show the run itself while the optimizations are still going
+    progress(0, total, (simulation_df, format_single_stats(stats)))
+
+    optimal = []
+    for step, (name, optimizer) in enumerate(optimizers):
+        report = lambda done, count: progress(step + done / count, total)
+        with instrument.phase(name):
+            answer, _ = cache.call(lambda: optimizer(report), name, MODEL_VERSION, replications=replications,
+                                   seed=OPTIMIZER_SEED, **tables)
+        optimal.append(answer)
+    return simulation_df, format_single_stats(stats, *optimal)
+
+
+def simulate_multiple_runs(progress, runs, days, max_basement, review_period):
+    totals = {
+        "FF Inventory": 0,
+        "Basement Inventory": 0,
+        "Shortage Days": 0,
+        "Demand": 0,
+        "Lead Time": 0,
+        "Basement Shortage": 0,
     }
 
-
-def optimalMaxBasement():
-    for max_basement in range(10, 40,5):
-        _, stats = runSim(40, max_basement, 6)
-        if stats["basement_shortage"] == 0:
-            return max_basement
-
-
-def find_best_value(func):
-    results = [func() for _ in range(200)]
-    return Counter(results).most_common(1)[0][0]
-
-
-def optimalReviewPeriod():
-    for reviewPeriod in range(5, 15):
-        _, stats = runSim(20, 30, reviewPeriod)
-        if stats["basement_shortage"] != 0:
-            return reviewPeriod - 1
-
-
-def find_optimal_combination():
-    optimal_combination = None
-    min_basement_shortage = float('inf')
-    for max_basement in range(20, 40, 2):
-        for review_period in range(4, 11):
-            _, stats = runSim(days=100, max_basement_inventory=max_basement, review_period=review_period)
-            if stats["basement_shortage"] < min_basement_shortage:
-                min_basement_shortage = stats["basement_shortage"]
-                optimal_combination = (max_basement, review_period)
-            if stats["basement_shortage"] == 0:
-                return optimal_combination
-    return optimal_combination
+    with instrument.run_profile("inventory multiple runs"):
+        for run in range(1, runs + 1):
+            with instrument.phase("runSim"):
+                _, stats = runSim(days, max_basement, review_period)
+            totals["FF Inventory"] += stats["avg_ff"]
+            totals["Basement Inventory"] += stats["avg_basement"]
+            totals["Shortage Days"] += stats["total_shortage_days"]
+            totals["Demand"] += stats["experimental_avg_demand"]
+            totals["Lead Time"] += stats["experimental_avg_lead_time"]
+            totals["Basement Shortage"] += stats["basement_shortage"]
+            progress(run, runs, format_multiple_stats(totals, run))
+    return format_multiple_stats(totals, runs)
+
+
+def format_multiple_stats(totals, runs):
+    averages = {key: value / runs for key, value in totals.items()}
+    return (
+        f"Results for {runs} runs:\n"
+        f"------------------------------\n"
+        f"Average FF Inventory: {averages['FF Inventory']:.2f}\n"
+        f"Average Basement Inventory: {averages['Basement Inventory']:.2f}\n"
+        f"Average Shortage Days: {averages['Shortage Days']:.2f}\n"
+        f"Average Demand: {averages['Demand']:.2f}\n"
+        f"Average Lead Time: {averages['Lead Time']:.2f}\n"
+        f"Average Basement Shortage: {averages['Basement Shortage']:.2f}\n"
+    )
 
 
 class SimulationApp:
     def __init__(self, root):
         self.root = root
         self.root.title("Inventory Simulation")
+        self.task = None  # simulation running in the background
+        self.cache = ResultCache(CACHE_DIR)  # results of seeded runs and of the optimizations
         self.create_input_section()
         self.create_results_section()
         self.root.minsize(1300, 600)
@@ -214,101 +157,111 @@ class SimulationApp:
         self.runs_entry.grid(row=3, column=1, padx=5, pady=5)
         self.runs_entry.insert(0, "10")
 
+        # blank gives a new random run every time, a seed gives a repeatable (and cached) one
+        tk.Label(frame, text="Seed (optional)").grid(row=4, column=0, padx=5, pady=5)
+        self.seed_entry = ttk.Entry(frame)
+        self.seed_entry.grid(row=4, column=1, padx=5, pady=5)
+
         self.run_single_btn = ttk.Button(frame, text="Run Single Simulation", command=self.run_single_simulation)
-        self.run_single_btn.grid(row=4, column=0, padx=5, pady=5)
+        self.run_single_btn.grid(row=5, column=0, padx=5, pady=5)
 
         self.run_multiple_btn = ttk.Button(frame, text="Run Multiple Simulations",
                                            command=self.run_multiple_simulations)
-        self.run_multiple_btn.grid(row=4, column=1, padx=5, pady=5)
+        self.run_multiple_btn.grid(row=5, column=1, padx=5, pady=5)
 
         self.plot_histograms_btn = ttk.Button(frame, text="Display Histograms", command=self.plot_histograms)
-        self.plot_histograms_btn.grid(row=5, column=0, columnspan=2, padx=5, pady=10)
+        self.plot_histograms_btn.grid(row=6, column=0, columnspan=2, padx=5, pady=10)
+
+        # progress of the simulation running in the background
+        self.progress_bar = ttk.Progressbar(frame, orient="horizontal", mode="determinate", length=250)
+        self.progress_bar.grid(row=7, column=0, columnspan=2, padx=5, pady=5)
+        self.status_label = tk.Label(frame, text="Ready")
+        self.status_label.grid(row=8, column=0, padx=5, pady=5)
+        self.cancel_btn = ttk.Button(frame, text="Cancel", command=self.cancel, state="disabled")
+        self.cancel_btn.grid(row=8, column=1, padx=5, pady=5)
 
     def create_results_section(self):
         frame = ttk.Frame(self.root)
         frame.pack(pady=10, padx=10, fill="both", expand=True)
 
-        canvas = tk.Canvas(frame)
-        scrollbar = ttk.Scrollbar(frame, orient="vertical", command=canvas.yview)
-        scrollable_frame = ttk.Frame(canvas)
+        # only the rows on screen are ever drawn, so long runs display instantly
+        self.table = VirtualTable(frame, visible_rows=20)
+        self.table.pack(fill="both", expand=True)
 
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-
-        canvas.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
-
-        self.canvas = canvas
-        self.scrollable_frame = scrollable_frame
-        self.results_frame = ttk.Frame(scrollable_frame)
-        self.results_frame.pack(fill="both", expand=True)
+        self.stats_frame = ttk.LabelFrame(frame, text="Simulation Statistics", padding=(10, 5))
+        self.stats_frame.pack(pady=10, fill="x")
 
     def display_results(self, result=None, stats=None):
-        for widget in self.results_frame.winfo_children():
-            widget.destroy()
+        with instrument.run_profile("inventory display"), instrument.phase("display_results"):
+            self._display_results(result, stats)
 
+    def _display_results(self, result=None, stats=None):
         # Display table if result is provided
         if result is not None and isinstance(result, pd.DataFrame):
-            for i, column in enumerate(result.columns):
-                label = tk.Label(self.results_frame, text=column, relief="solid", padx=5, pady=5, bg="lightgray")
-                label.grid(row=0, column=i, sticky="nsew")
-            for row_index, row in result.iterrows():
-                for col_index, value in enumerate(row):
-                    label = tk.Label(self.results_frame, text=value, relief="solid", padx=5, pady=5)
-                    label.grid(row=row_index + 1, column=col_index, sticky="nsew")
-
-            next_row = len(result) + 1  # Place stats below the table
-            num_columns = len(result.columns)
+            self.table.set_data(result)
         else:
-            # If no table, set the starting row and column count
-            next_row = 0
-            num_columns = 1
+            self.table.clear()
 
-        # Display stats in a styled frame
-        if stats:
-            stats_frame = ttk.LabelFrame(self.results_frame, text="Simulation Statistics", padding=(10, 5))
-            stats_frame.grid(row=next_row, column=0, columnspan=num_columns, pady=10, sticky="ew")
+        for widget in self.stats_frame.winfo_children():
+            widget.destroy()
 
-            # Add stats as labels in the frame
+        # Add stats as labels in the frame
+        if stats:
             for i, line in enumerate(stats.split("\n")):
                 if line.strip():  # Skip empty lines
-                    label = tk.Label(stats_frame, text=line, anchor="w", padx=5, pady=2)
+                    label = tk.Label(self.stats_frame, text=line, anchor="w", padx=5, pady=2)
                     label.grid(row=i, column=0, sticky="w")
-        self.canvas.yview_moveto(0)
 
+    # starts work(progress, *args) on a worker thread, one task at a time
+    def start_task(self, work, on_done, *args):
+        if self.task is not None and self.task.running:
+            return
+        self.task = BackgroundTask(self.root, work, on_progress=self.show_progress,
+                                   on_done=lambda result: self.finish_task(on_done, result),
+                                   on_error=self.show_error, on_cancelled=self.show_cancelled)
+        self.progress_bar["value"] = 0
+        self.status_label.config(text="Running...")
+        self.cancel_btn.config(state="normal")
+        self.task.start(*args)
+
+    def finish_task(self, on_done, result):
+        self.cancel_btn.config(state="disabled")
+        self.progress_bar["value"] = 100
+        self.status_label.config(text=f"Done ({self.cache.summary()})")
+        on_done(result)
+
+    def show_progress(self, done, total, partial=None):
+        self.progress_bar["value"] = 100 * done / total if total else 0
+        self.status_label.config(text=f"{100 * done / total:.0f}%" if total else "")
+        if isinstance(partial, tuple):
+            self.display_results(*partial)
+        elif partial is not None:
+            self.display_results(None, partial)
+
+    def show_error(self, error):
+        self.cancel_btn.config(state="disabled")
+        self.status_label.config(text="Error")
+        messagebox.showerror("Simulation Error", str(error))
+
+    def show_cancelled(self):
+        self.cancel_btn.config(state="disabled")
+        self.status_label.config(text="Cancelled")
+
+    def cancel(self):
+        if self.task is not None:
+            self.task.cancel()
 
     def run_single_simulation(self):
         try:
             days = int(self.days_entry.get())
             max_basement = int(self.basement_entry.get())
             review_period = int(self.review_entry.get())
-            simulation_df, stats = runSim(days, max_basement, review_period)
-
-            optimal_max_basement = find_best_value(optimalMaxBasement)
-            optimal_review_period = find_best_value(optimalReviewPeriod)
-            optimal_combination = find_best_value(find_optimal_combination)
-
-            stats_str = (
-                f"Average FF Inventory: {stats['avg_ff']}\n"
-                f"Average Basement Inventory: {stats['avg_basement']}\n"
-                f"Total Shortage Days: {stats['total_shortage_days']}\n"
-                f"Total Basement Shortage Days: {stats['total_basement_shortage']}\n"
-                f"Experimental Avg Demand: {stats['experimental_avg_demand']:.2f}\n"
-                f"Experimental Avg Lead Time: {stats['experimental_avg_lead_time']:.2f}\n"
-                f"Theoretical Avg Demand: {stats['theoretical_avg_demand']:.2f}\n"
-                f"Theoretical Avg Lead Time: {stats['theoretical_avg_lead_time']:.2f}\n"
-                f"Optimal Max Basement: {optimal_max_basement}\n"
-                f"Optimal Review Period: {optimal_review_period}\n"
-                f"Optimal Combination: {optimal_combination}\n"
-            )
-
-            self.display_results(simulation_df, stats_str)
+            seed = int(self.seed_entry.get()) if self.seed_entry.get().strip() else None
         except ValueError:
             messagebox.showerror("Input Error", "Please enter valid numerical values.")
+            return
+        self.start_task(simulate_single_run, lambda result: self.display_results(*result),
+                        days, max_basement, review_period, seed, self.cache)
 
     def run_multiple_simulations(self):
         try:
@@ -316,46 +269,17 @@ class SimulationApp:
             days = int(self.days_entry.get())
             max_basement = int(self.basement_entry.get())
             review_period = int(self.review_entry.get())
-
-            averages = {
-                "FF Inventory": 0,
-                "Basement Inventory": 0,
-                "Shortage Days": 0,
-                "Demand": 0,
-                "Lead Time": 0,
-                "Basement Shortage": 0,
-            }
-
-            for _ in range(runs):
-                _, stats = runSim(days, max_basement, review_period)
-                averages["FF Inventory"] += stats["avg_ff"]
-                averages["Basement Inventory"] += stats["avg_basement"]
-                averages["Shortage Days"] += stats["total_shortage_days"]
-                averages["Demand"] += stats["experimental_avg_demand"]
-                averages["Lead Time"] += stats["experimental_avg_lead_time"]
-                averages["Basement Shortage"] += stats["basement_shortage"]
-
-            for key in averages.keys():
-                averages[key] /= runs
-
-            # Prepare a stats string
-            stats_str = (
-                f"Results for {runs} runs:\n"
-                f"------------------------------\n"
-                f"Average FF Inventory: {averages['FF Inventory']:.2f}\n"
-                f"Average Basement Inventory: {averages['Basement Inventory']:.2f}\n"
-                f"Average Shortage Days: {averages['Shortage Days']:.2f}\n"
-                f"Average Demand: {averages['Demand']:.2f}\n"
-                f"Average Lead Time: {averages['Lead Time']:.2f}\n"
-                f"Average Basement Shortage: {averages['Basement Shortage']:.2f}\n"
-            )
-
-            # Call display_results with only stats
-            self.display_results(None, stats_str)
         except ValueError:
             messagebox.showerror("Input Error", "Please enter valid numerical values.")
+            return
+        # Call display_results with only stats
+        self.start_task(simulate_multiple_runs, lambda stats_str: self.display_results(None, stats_str),
+                        runs, days, max_basement, review_period)
 
     def plot_histograms(self):
+        # slow to import, only needed once something is plotted
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
         try:
             days = int(self.days_entry.get())
             max_basement = int(self.basement_entry.get())
@@ -398,6 +322,7 @@ class SimulationApp:
             messagebox.showerror("Input Error", "Please enter valid numerical values.")
 
 
-root = tk.Tk()
-app = SimulationApp(root)
-root.mainloop()
\ No newline at end of file
+if __name__ == "__main__":
+    root = tk.Tk()
+    app = SimulationApp(root)
+    root.mainloop()
\ No newline at end of file
@@ -1,67 +1,150 @@
 import tkinter as tk
-import subprocess
+import importlib.util
 import os
+import sys
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# The simulations run inside this process, each in its own window, instead of
+# a new python per click. Their modules are loaded by file path under unique
+# names (both folders have a src.py) and are imported in the background as
+# soon as the launcher is on screen, so a click only has to build the window.
+# name -> (folder, module name, GUI class)
+APPS = {
+    "petrol": ("Petrol Station", "petrol_station_app", "GasStationApp"),
+    "inventory": ("hospital inventory system", "hospital_inventory_app", "SimulationApp"),
+}
+
+modules = {}
+load_lock = threading.Lock()
+windows = {}
+root = None  # launcher window, made by main()
+status_label = None
+
+
+# imports one simulation's src.py, only the first call does any work
+def load_app(name):
+    with load_lock:
+        if name not in modules:
+            folder, module_name, _ = APPS[name]
+            folder = os.path.join(BASE_DIR, folder)
+            if folder not in sys.path:
+                sys.path.insert(0, folder)  # for the modules next to src.py
+            spec = importlib.util.spec_from_file_location(module_name, os.path.join(folder, "src.py"))
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            sys.modules[module_name] = module
+            modules[name] = module
+        return modules[name]
+
+
+# runs on a worker thread, only imports (no widgets are touched)
+def warm_up():
+    for name in APPS:
+        try:
+            load_app(name)
+        except Exception:
+            pass  # the click will load it again and show the error
+
+
+def open_app(name):
+    window = windows.get(name)
+    if window is not None and window.winfo_exists():
+        window.deiconify()
+        window.lift()
+        return
+    started = time.perf_counter()
+    try:
+        module = load_app(name)
+    except Exception as error:
+        status_label.config(text=f"Could not load {APPS[name][0]}: {error}")
+        return
+    window = tk.Toplevel(root)
+    getattr(module, APPS[name][2])(window)
+    window.update_idletasks()
+    windows[name] = window
+    status_label.config(text=f"{APPS[name][0]} ready in {time.perf_counter() - started:.2f} s")
+
 
 # Function to run the Multichannel Queue project
 def run_multichannel_queue():
-      subprocess.run(["python", ".\\petrol station\\src.py"])
+    open_app("petrol")
+
 # Function to run the Inventory project
 def run_inventory():
-    subprocess.run(["python", ".\\hospital inventory system\\src.py"])
+    open_app("inventory")
 
 # Function to exit the application
 def exit_app():
     root.destroy()
 
-# Create the main window
-root = tk.Tk()
-root.title("Simulation Project")
-
-# Set the window size
-root.geometry("600x400")
-
-# Add a title label
-title_label = tk.Label(root, text="Select a Simulation Project", font=("Arial", 16))
-title_label.pack(pady=5)
-
-# Load images using tkinter's PhotoImage with full path
-queue_image_path = os.path.join('./img/', "img.gif")
-inventory_image_path = os.path.join('./img/', "img1.gif")
-
-queue_photo = tk.PhotoImage(file=queue_image_path)  # Load the first image
-inventory_photo = tk.PhotoImage(file=inventory_image_path)  # Load the second image
-
-# Create a frame for the buttons and images
-frame = tk.Frame(root)
-frame.pack(pady=5)
-
-# Add button for Multichannel Queue project
-queue_button = tk.Button(
-    frame,
-    text="Multichannel Queue (Petrol Station)",
-    command=run_multichannel_queue,
-    compound="top",  # Position the image above the text
-    image=queue_photo if queue_photo else None,  # Use the image if loaded
-    width=250,  # Button width
-    height=270  # Button height
-)
-queue_button.grid(row=0, column=0, padx=5, pady=5)
-
-# Add button for Inventory project
-inventory_button = tk.Button(
-    frame,
-    text="Inventory (Hospital Basement Inventory)",
-    command=run_inventory,
-    compound="top",  # Position the image above the text
-    image=inventory_photo if inventory_photo else None,  # Use the image if loaded
-    width=250,  # Button width
-    height=270  # Button height
-)
-inventory_button.grid(row=0, column=1, padx=5, pady=5)
-
-# Add an exit button
-exit_button = tk.Button(root, text="Exit", command=exit_app, width=20, height=2)
-exit_button.pack(pady=10)
-
-# Run the Tkinter event loop
-root.mainloop()
+# Builds the launcher window. It runs only when main.py is started, not when
+# a process pool worker of one of the simulations imports this file again
+# (spawn start method, the default on Windows and macOS).
+def main():
+    global root, status_label
+    # Create the main window
+    root = tk.Tk()
+    root.title("Simulation Project")
+
+    # Set the window size
+    root.geometry("600x420")
+
+    # Add a title label
+    title_label = tk.Label(root, text="Select a Simulation Project", font=("Arial", 16))
+    title_label.pack(pady=5)
+
+    # Load images using tkinter's PhotoImage with full path
+    queue_image_path = os.path.join(BASE_DIR, "img", "img.gif")
+    inventory_image_path = os.path.join(BASE_DIR, "img", "img1.gif")
+
+    queue_photo = tk.PhotoImage(file=queue_image_path)  # Load the first image
+    inventory_photo = tk.PhotoImage(file=inventory_image_path)  # Load the second image
+
+    # Create a frame for the buttons and images
+    frame = tk.Frame(root)
+    frame.pack(pady=5)
+
+    # Add button for Multichannel Queue project
+    queue_button = tk.Button(
+        frame,
+        text="Multichannel Queue (Petrol Station)",
+        command=run_multichannel_queue,
+        compound="top",  # Position the image above the text
+        image=queue_photo if queue_photo else None,  # Use the image if loaded
+        width=250,  # Button width
+        height=270  # Button height
+    )
+    queue_button.grid(row=0, column=0, padx=5, pady=5)
+
+    # Add button for Inventory project
+    inventory_button = tk.Button(
+        frame,
+        text="Inventory (Hospital Basement Inventory)",
+        command=run_inventory,
+        compound="top",  # Position the image above the text
+        image=inventory_photo if inventory_photo else None,  # Use the image if loaded
+        width=250,  # Button width
+        height=270  # Button height
+    )
+    inventory_button.grid(row=0, column=1, padx=5, pady=5)
+
+    # Add an exit button
+    exit_button = tk.Button(root, text="Exit", command=exit_app, width=20, height=2)
+    exit_button.pack(pady=10)
+
+    # Time from a click to its window being ready
+    status_label = tk.Label(root, text="")
+    status_label.pack()
+
+    # Import the simulations while the user is choosing one
+    root.after(100, lambda: threading.Thread(target=warm_up, daemon=True).start())
+
+    # Run the Tkinter event loop
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Pieces shared by the petrol station and the hospital inventory simulations.
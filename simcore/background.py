@@ -0,0 +1,92 @@
+import queue
+import threading
+
+# Runs a simulation on a worker thread so the Tk window stays responsive.
+# The worker never touches widgets: it puts progress messages on a queue and
+# the Tk event loop polls that queue with root.after(), calling the callbacks
+# on the main thread.
+#
+#   task = BackgroundTask(root, work, on_progress=..., on_done=...)
+#   task.start(arg1, arg2)      # work(progress, arg1, arg2) runs in the thread
+#   task.cancel()               # the next progress() call raises TaskCancelled
+#
+# work reports with progress(done, total, partial=None); partial can be any
+# value the GUI knows how to show (e.g. running averages as text).
+
+
+class TaskCancelled(Exception):
+    pass
+
+
+class BackgroundTask:
+    def __init__(self, root, work, on_progress=None, on_done=None, on_error=None,
+                 on_cancelled=None, poll_ms=50):
+        self.root = root
+        self.work = work
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_cancelled = on_cancelled
+        self.poll_ms = poll_ms
+        self.messages = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.thread = None
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, *args):
+        self.thread = threading.Thread(target=self._run, args=args, daemon=True)
+        self.thread.start()
+        self.root.after(self.poll_ms, self._poll)
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    # handed to the work function, runs on the worker thread
+    def progress(self, done, total, partial=None):
+        if self.cancel_event.is_set():
+            raise TaskCancelled()
+        self.messages.put(("progress", (done, total, partial)))
+
+    def _run(self, *args):
+        try:
+            result = self.work(self.progress, *args)
+        except TaskCancelled:
+            self.messages.put(("cancelled", None))
+        except Exception as error:
+            self.messages.put(("error", error))
+        else:
+            self.messages.put(("done", result))
+
+    # runs on the Tk thread. Only the newest progress is worth drawing, but a
+    # partial result is kept even if plain progress messages came after it.
+    def _poll(self):
+        latest = None
+        partial = None
+        while True:
+            try:
+                kind, payload = self.messages.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                latest = payload
+                if payload[2] is not None:
+                    partial = payload[2]
+                continue
+            self._report(latest, partial)
+            if kind == "done" and self.on_done:
+                self.on_done(payload)
+            elif kind == "error" and self.on_error:
+                self.on_error(payload)
+            elif kind == "cancelled" and self.on_cancelled:
+                self.on_cancelled()
+            return
+        self._report(latest, partial)
+        self.root.after(self.poll_ms, self._poll)
+
+    def _report(self, latest, partial):
+        if latest is not None and self.on_progress:
+            done, total, _ = latest
+            self.on_progress(done, total, partial)
@@ -0,0 +1,147 @@
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+# Memoized simulation results, in memory and on disk. A result is stored under
+# a hash of everything that decides it: the name of the computation, the model
+# parameters and probability tables, the seed and the version of the model's
+# source code (so editing the model drops the old results). Both levels keep
+# the most recently used results and evict the oldest ones past their size
+# limit. Results with seed=None are random on purpose and are never cached.
+#
+#   cache = ResultCache("Simulation_Results/.cache")
+#   data, stats = cache.call(lambda: run_simulation(1000, seed=7), "run_simulation",
+#                            version, n_cars=1000, seed=7)
+#   cache.hits, cache.misses
+
+MISSING = object()
+
+
+# hash of the source files the results depend on
+def code_version(*paths):
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        with open(path, "rb") as file:
+            digest.update(file.read())
+    return digest.hexdigest()[:16]
+
+
+# repr() of ints, floats, strings, tuples and lists is stable across runs, so
+# it is hashed instead of a pickle (which can change between versions)
+def make_key(name, version, params):
+    text = repr((name, version, sorted(params.items())))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, directory=None, max_memory_bytes=128 * 2 ** 20, max_disk_bytes=512 * 2 ** 20):
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.memory = OrderedDict()  # key -> (value, pickled size), oldest first
+        self.memory_bytes = 0
+        self.hits = 0  # found in memory
+        self.disk_hits = 0  # found on disk
+        self.misses = 0
+        self.lock = threading.Lock()  # the GUIs use the cache from their worker thread
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".pkl")
+
+    # the stored value or MISSING. Values from memory are the same object every
+    # time, callers must not change them.
+    def get(self, key):
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return self.memory[key][0]
+        if self.directory is not None and os.path.exists(self._path(key)):
+            try:
+                with open(self._path(key), "rb") as file:
+                    blob = file.read()
+                value = pickle.loads(blob)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                pass  # removed or half written by another process, compute it again
+            else:
+                os.utime(self._path(key))  # mark as recently used
+                with self.lock:
+                    self.disk_hits += 1
+                    self._remember(key, value, len(blob))
+                return value
+        with self.lock:
+            self.misses += 1
+        return MISSING
+
+    def put(self, key, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            self._remember(key, value, len(blob))
+        if self.directory is not None and len(blob) <= self.max_disk_bytes:
+            # written next to the final name and moved, readers never see half a file
+            temporary = self._path(key) + f".{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporary, "wb") as file:
+                file.write(blob)
+            os.replace(temporary, self._path(key))
+            self._evict_disk()
+
+    # compute() the first time, the stored result afterwards
+    def call(self, compute, name, version, **params):
+        if params.get("seed", 0) is None:
+            return compute()
+        key = make_key(name, version, params)
+        value = self.get(key)
+        if value is MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def _remember(self, key, value, size):
+        if key in self.memory:
+            self.memory_bytes -= self.memory.pop(key)[1]
+        if size > self.max_memory_bytes:
+            return
+        self.memory[key] = (value, size)
+        self.memory_bytes += size
+        while self.memory_bytes > self.max_memory_bytes:
+            _, (_, old_size) = self.memory.popitem(last=False)
+            self.memory_bytes -= old_size
+
+    # deletes the least recently used files until the folder fits
+    def _evict_disk(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".pkl"):
+                path = os.path.join(self.directory, name)
+                try:
+                    info = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((info.st_mtime, info.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+            self.memory_bytes = 0
+        if self.directory is not None:
+            for name in os.listdir(self.directory):
+                if name.endswith(".pkl"):
+                    os.remove(os.path.join(self.directory, name))
+
+    # e.g. "cache: 3 hits, 1 miss"
+    def summary(self):
+        hits = self.hits + self.disk_hits
+        return f"cache: {hits} hit{'s' if hits != 1 else ''}, {self.misses} miss{'es' if self.misses != 1 else ''}"
@@ -0,0 +1,161 @@
+import itertools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Optional instrumentation for the simulations: time per phase, counters and
+# a snapshot of where memory was allocated. It is off by default; phase() then
+# returns a shared do-nothing context and count() returns at once, so the
+# calls can stay in the code. Nothing is ever called per car or per day, only
+# around whole phases and once per run.
+#
+#   with profiling("petrol run", trace_memory=True) as profile:
+#       run_simulation(100000)
+#   print(profile.report())
+#
+# Setting SIMCORE_PROFILE=<folder> turns it on for the GUIs: every run then
+# writes its report to that folder (see run_profile()).
+
+PROFILE_ENV = "SIMCORE_PROFILE"
+
+enabled = False
+_current = None
+_lock = threading.Lock()
+_report_numbers = itertools.count(1)
+
+
+class Profile:
+    def __init__(self, label="", trace_memory=False):
+        self.label = label
+        self.trace_memory = trace_memory
+        self.timers = {}  # phase -> [total seconds, calls]
+        self.counters = {}
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self.peak_bytes = None
+        self.top_allocations = []  # (file:line, bytes, blocks)
+
+    def add_time(self, name, seconds):
+        with _lock:
+            timer = self.timers.setdefault(name, [0.0, 0])
+            timer[0] += seconds
+            timer[1] += 1
+
+    def add_count(self, name, amount):
+        with _lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def report(self):
+        lines = [f"Profile: {self.label}  ({self.elapsed:.3f} s)", "", "Phases:"]
+        for name, (seconds, calls) in sorted(self.timers.items(), key=lambda item: -item[1][0]):
+            share = 100 * seconds / self.elapsed if self.elapsed else 0
+            lines.append(f"   {name:<28}{seconds:>10.4f} s {share:>6.1f}%   x{calls}")
+        if self.counters:
+            lines += ["", "Counters:"]
+            lines += [f"   {name:<28}{value:>12}" for name, value in sorted(self.counters.items())]
+        if self.peak_bytes is not None:
+            lines += ["", f"Peak traced memory: {self.peak_bytes / 2 ** 20:.1f} MB", "Largest allocations still held at the end:"]
+            lines += [f"   {size / 2 ** 20:>8.2f} MB {blocks:>8} blocks  {where}"
+                      for where, size, blocks in self.top_allocations]
+        return "\n".join(lines) + "\n"
+
+    def as_dict(self):
+        return {"label": self.label, "elapsed": self.elapsed,
+                "timers": {name: {"seconds": seconds, "calls": calls}
+                           for name, (seconds, calls) in self.timers.items()},
+                "counters": self.counters, "peak_bytes": self.peak_bytes,
+                "top_allocations": self.top_allocations}
+
+    # .json gets the raw numbers, anything else the text report
+    def dump(self, path):
+        with open(path, "w") as file:
+            if path.endswith(".json"):
+                json.dump(self.as_dict(), file, indent=1)
+            else:
+                file.write(self.report())
+
+
+class _Phase:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        profile = _current
+        if profile is not None:
+            profile.add_time(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class _NoPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_PHASE = _NoPhase()
+
+
+# with phase("routing"): ...
+def phase(name):
+    return _Phase(name) if enabled else _NO_PHASE
+
+
+def count(name, amount=1):
+    profile = _current
+    if profile is not None:
+        profile.add_count(name, int(amount))
+
+
+# collects everything inside the block into a new Profile. Only one profile
+# is active at a time; nested calls add to the outer one.
+@contextmanager
+def profiling(label="", trace_memory=False):
+    global enabled, _current
+    if enabled:
+        yield _current
+        return
+    profile = Profile(label, trace_memory)
+    tracing = trace_memory and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    _current = profile
+    enabled = True
+    try:
+        yield profile
+    finally:
+        enabled = False
+        _current = None
+        profile.elapsed = time.perf_counter() - profile.started
+        if tracing:
+            _, profile.peak_bytes = tracemalloc.get_traced_memory()
+            statistics = tracemalloc.take_snapshot().statistics("lineno")[:10]
+            profile.top_allocations = [(str(stat.traceback), stat.size, stat.count) for stat in statistics]
+            tracemalloc.stop()
+
+
+# profiling() that writes its report to $SIMCORE_PROFILE/<label>-<time>-<n>.txt
+# when that variable is set, and does nothing otherwise
+@contextmanager
+def run_profile(label):
+    directory = os.environ.get(PROFILE_ENV)
+    if not directory or enabled:
+        yield _current  # off, or inside another profile that writes the report
+        return
+    os.makedirs(directory, exist_ok=True)
+    with profiling(label, trace_memory=True) as profile:
+        yield profile
+    name = "".join(char if char.isalnum() else "_" for char in label)
+    profile.dump(os.path.join(directory, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{next(_report_numbers)}.txt"))
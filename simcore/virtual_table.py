@@ -0,0 +1,84 @@
+from tkinter import ttk
+
+# Table for results with many rows. A ttk.Treeview only ever holds the rows
+# that fit on screen; scrolling changes which slice of the data those rows
+# show instead of creating one widget (or one tree item) per cell. Showing a
+# 100k-day run costs the same as showing a 20-day one.
+#
+#   table = VirtualTable(frame, visible_rows=20)
+#   table.pack(fill="both", expand=True)
+#   table.set_data(df)
+
+
+class VirtualTable(ttk.Frame):
+    def __init__(self, master, visible_rows=20, column_width=120, **kwargs):
+        super().__init__(master, **kwargs)
+        self.visible_rows = visible_rows
+        self.column_width = column_width
+        self.values = []
+        self.top = 0  # index of the first row on screen
+
+        self.tree = ttk.Treeview(self, show="headings", height=visible_rows, selectmode="none")
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.xscrollbar = ttk.Scrollbar(self, orient="horizontal", command=self.tree.xview)
+        self.tree.configure(xscrollcommand=self.xscrollbar.set)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        self.xscrollbar.grid(row=1, column=0, sticky="ew")
+        self.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
+
+        self.items = [self.tree.insert("", "end", values=()) for _ in range(visible_rows)]
+        for widget in (self.tree, self.scrollbar):
+            widget.bind("<MouseWheel>", self._on_mousewheel)
+            widget.bind("<Button-4>", lambda event: self.scroll_to(self.top - 3))
+            widget.bind("<Button-5>", lambda event: self.scroll_to(self.top + 3))
+        self.tree.bind("<Prior>", lambda event: self.scroll_to(self.top - self.visible_rows))
+        self.tree.bind("<Next>", lambda event: self.scroll_to(self.top + self.visible_rows))
+        self._update_scrollbar()
+
+    # shows a DataFrame; only a reference to its values is kept
+    def set_data(self, df):
+        columns = [str(column) for column in df.columns]
+        self.tree.configure(columns=columns)
+        for column in columns:
+            self.tree.heading(column, text=column)
+            self.tree.column(column, width=self.column_width, anchor="center", stretch=False)
+        self.values = df.to_numpy(dtype=object)
+        self.scroll_to(0)
+
+    def clear(self):
+        self.tree.configure(columns=())
+        self.values = []
+        self.scroll_to(0)
+
+    def scroll_to(self, top):
+        last_top = max(0, len(self.values) - self.visible_rows)
+        self.top = min(max(0, int(top)), last_top)
+        for offset, item in enumerate(self.items):
+            row = self.top + offset
+            self.tree.item(item, values=list(self.values[row]) if row < len(self.values) else ())
+        self._update_scrollbar()
+
+    # scrollbar command, same arguments as Treeview.yview
+    def yview(self, *args):
+        if not args:
+            return
+        if args[0] == "moveto":
+            self.scroll_to(float(args[1]) * len(self.values))
+        elif args[0] == "scroll":
+            step = self.visible_rows if args[2] == "pages" else 1
+            self.scroll_to(self.top + int(args[1]) * step)
+
+    # Windows sends multiples of 120 per notch, macOS small raw deltas
+    def _on_mousewheel(self, event):
+        notches = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        self.scroll_to(self.top - 3 * notches)
+        return "break"
+
+    def _update_scrollbar(self):
+        n_rows = len(self.values)
+        if n_rows <= self.visible_rows:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self.top / n_rows, (self.top + self.visible_rows) / n_rows)
@@ -0,0 +1,23 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "hospital inventory system"))
+from day_stream import runSimStream
+from inventory import run_batch, runSim
+from policy_grid import evaluate_grid
+from selection import select_best_policy
+
+
+# every model path rejects a review period below 1 with the same error
+@pytest.mark.parametrize("run", [
+    lambda: runSim(20, 30, 0),
+    lambda: run_batch(5, 20, 30, 0),
+    lambda: run_batch(2, 20, 30, [6, 0]),
+    lambda: runSimStream(20, 30, 0),
+    lambda: evaluate_grid([30], [0, 6], 20, replications=5, workers=1),
+    lambda: select_best_policy([(30, 0), (30, 6)], seed=1),
+])
+def test_review_period_below_one_is_rejected(run):
+    with pytest.raises(ValueError, match="review_period must be at least 1"):
+        run()
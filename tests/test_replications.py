@@ -0,0 +1,22 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Petrol Station"))
+from replications import iter_until_precise
+
+
+# copies of the results as they are yielded, nothing added afterwards counts
+def _yielded(*args, **kwargs):
+    return [dict(result) for result in iter_until_precise(*args, **kwargs)]
+
+
+def test_target_met_comes_with_the_last_run():
+    results = _yielded(200, {"overall_avg_wait": 100.0}, seed=1, workers=1)
+    assert results[-1]["target_met"] is True
+    assert not any("target_met" in result for result in results[:-1])
+
+
+def test_target_not_met_at_max_runs():
+    results = _yielded(200, {"overall_avg_wait": 1e-6}, seed=1, workers=1, max_runs=12)
+    assert len(results) == 12
+    assert results[-1]["target_met"] is False
@@ -0,0 +1,27 @@
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "hospital inventory system"))
+from selection import _eliminate, adaptive_optimal_combination, select_best_policy
+
+
+# each policy is within delta of the next, none may drop the whole chain
+def test_chained_policies_keep_the_best():
+    assert _eliminate([0, 1, 2], np.array([29.0, 20.0, 11.0]), 10, np.zeros((3, 3)), 5.0, 1.0) == [2]
+
+
+def test_select_best_policy_on_a_chained_subset():
+    policies = [(28, 10), (24, 8), (20, 6), (26, 4), (32, 4)]
+    result = select_best_policy(policies, delta=3, seed=0)
+    # (26, 4) and (32, 4) never run short, the first of them wins
+    assert result["best"] == (26, 4)
+    assert result["total_replications"] <= 200
+
+
+# the policies without shortage tie, the race must not run to its bound on them
+def test_adaptive_search_costs_less_than_the_grid():
+    best, result = adaptive_optimal_combination(seed=0)
+    assert best == (20, 4)
+    grid = 70 * 200  # policy_grid.optimal_combination(): every policy on 200 streams
+    assert result["total_replications"] <= grid // 2
@@ -0,0 +1,31 @@
+import math
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from simcore.stats import t_half_width, t_quantile
+
+
+# published Student t table values
+@pytest.mark.parametrize("p, df, expected", [
+    (0.975, 1, 12.7062), (0.995, 1, 63.6567),
+    (0.975, 2, 4.3027), (0.995, 2, 9.9248),
+    (0.975, 3, 3.1824), (0.995, 3, 5.8409),
+    (0.975, 4, 2.7764), (0.995, 4, 4.6041),
+    (0.975, 5, 2.5706), (0.995, 5, 4.0321),
+    (0.95, 9, 1.8331), (0.975, 10, 2.2281),
+    (0.975, 19, 2.0930), (0.975, 30, 2.0423),
+    (0.975, 60, 2.0003), (0.975, 120, 1.9799),
+])
+def test_t_quantile_matches_the_table(p, df, expected):
+    assert t_quantile(p, df) == pytest.approx(expected, abs=1e-4)
+
+
+def test_t_quantile_is_symmetric():
+    assert t_quantile(0.025, 3) == pytest.approx(-t_quantile(0.975, 3), abs=1e-9)
+
+
+def test_half_width_needs_two_values():
+    assert math.isnan(t_half_width(1.0, 1))
+    assert t_half_width(2.0, 4) == pytest.approx(3.1824, abs=1e-4)